@@ -0,0 +1,32 @@
+"""add uploaded_object derivatives
+
+Revision ID: 9d3f6b2e8a15
+Revises: 5b7e9a1c3d24
+Create Date: 2026-10-18 18:12:44.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6b2e8a15'
+down_revision: Union[str, Sequence[str], None] = '5b7e9a1c3d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('uploaded_object', sa.Column('derivatives', sa.JSON(), nullable=True))
+    op.add_column('uploaded_object', sa.Column('derivatives_status', sa.String(length=16), nullable=True))
+    op.create_index(op.f('ix_uploaded_object_derivatives_status'), 'uploaded_object', ['derivatives_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_uploaded_object_derivatives_status'), table_name='uploaded_object')
+    op.drop_column('uploaded_object', 'derivatives_status')
+    op.drop_column('uploaded_object', 'derivatives')
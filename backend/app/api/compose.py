@@ -1,202 +1,305 @@
 # backend/app/api/compose.py
-import os, io, math, uuid, requests
-from fastapi import APIRouter, HTTPException, Form
-from typing import Optional
-from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
+import os, json, time, asyncio, hashlib
+import httpx
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Form, Depends
+from typing import Optional, Tuple, Literal, Dict
+from PIL import Image, ImageDraw
 from datetime import datetime, timezone
 from fastapi import Body
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
-from .files import _aws_v4_sign
+from app.api.auth import get_current_user
+from app.services.card_layout import FONT_PATH_BOLD, TEMPLATES, DEFAULT_TEMPLATE, template_digest
+from app.services.card_render import LAYOUT_VERSION, resolve_profile, output_meta
+from app.services.compose_engine import engine as compose_engine, ComposeBusy, encoder_stats
+from app.services.object_storage import storage, StorageError
+from app.services.upload_processing import feed_keys
 
 router = APIRouter()
 
-S3_BUCKET = os.getenv("S3_BUCKET", "pium-dev")
-S3_REGION = os.getenv("S3_REGION", "kr-standard")
-S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
-S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
-S3_ENDPOINT = os.getenv("S3_ENDPOINT", "https://kr.object.ncloudstorage.com")
 MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL") 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
-FONT_PATH_BOLD = os.path.join(UPLOADS_DIR, "BMDOHYEON_ttf.ttf")
-FONT_PATH_REG  = os.path.join(UPLOADS_DIR, "BMDOHYEON_ttf.ttf")
+
+COMPOSE_BG_KEY = os.getenv("COMPOSE_BG_KEY", "uploads/common/f465a025e7f540d1a850521bd9fc989e.jpg")
+# 이 시간 안에는 캐시된 배경을 그대로 쓰고, 지나면 If-None-Match 로 재검증
+COMPOSE_BG_REVALIDATE_SEC = int(os.getenv("COMPOSE_BG_REVALIDATE_SEC", "300"))
+# 이미 만들어진 합성 결과 키를 기억해 두는 개수 (없으면 HEAD 로 확인)
+COMPOSE_INDEX_MAX = int(os.getenv("COMPOSE_INDEX_MAX", "4096"))
 
 
 def _ensure_font():
     if not os.path.exists(FONT_PATH_BOLD):
         raise HTTPException(500, f"폰트 파일이 없습니다: {FONT_PATH_BOLD}")
 
-def _text_wh(font: ImageFont.FreeTypeFont, text: str):
-    x0, y0, x1, y1 = font.getbbox(text)
-    return (x1 - x0, y1 - y0)
-
-def _fit_font(text, max_w, max_h, font_path, max_size, min_size=18):
-    size = max_size
-    while size >= min_size:
-        font = ImageFont.truetype(font_path, size=size)
-        w, h = _text_wh(font, text)
-        if w <= max_w and h <= max_h:
-            return font
-        size -= 2
-    return ImageFont.truetype(font_path, size=min_size)
-
-def _presigned_get_url(key: str, expires: int = 600) -> str:
-    service = "s3"
-    algorithm = "AWS4-HMAC-SHA256"
-    now = datetime.now(timezone.utc)
-    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
-    date_stamp = now.strftime("%Y%m%d")
-    credential_scope = f"{date_stamp}/{S3_REGION}/{service}/aws4_request"
-    host = S3_ENDPOINT.replace("https://","").replace("http://","")
-    path = f"/{S3_BUCKET}/{key}"
-
-    import urllib.parse, hashlib, hmac
-    qs = {
-        "X-Amz-Algorithm": algorithm,
-        "X-Amz-Credential": f"{S3_ACCESS_KEY}/{credential_scope}",
-        "X-Amz-Date": amz_date,
-        "X-Amz-Expires": str(expires),
-        "X-Amz-SignedHeaders": "host",
-    }
-    canonical_query = "&".join(
-        f"{urllib.parse.quote(k, safe='~')}={urllib.parse.quote(v, safe='~')}"
-        for k, v in sorted(qs.items())
-    )
-    canonical_headers = f"host:{host}\n"
-    signed_headers = "host"
-    payload_hash = "UNSIGNED-PAYLOAD"
-
-    canonical_request = (
-        f"GET\n{path}\n{canonical_query}\n{canonical_headers}\n{signed_headers}\n{payload_hash}"
-    )
-
-    cr_hash = hashlib.sha256(canonical_request.encode()).hexdigest()
-    string_to_sign = f"{algorithm}\n{amz_date}\n{credential_scope}\n{cr_hash}"
-
-    def _sign(key: bytes, msg: str) -> bytes:
-        return hmac.new(key, msg.encode(), hashlib.sha256).digest()
-
-    k_date = _sign(("AWS4" + S3_SECRET_KEY).encode(), date_stamp)
-    k_region = _sign(k_date, S3_REGION)
-    k_service = _sign(k_region, service)
-    k_signing = _sign(k_service, "aws4_request")
-    signature = hmac.new(k_signing, string_to_sign.encode(), hashlib.sha256).hexdigest()
-
-    final_qs = canonical_query + f"&X-Amz-Signature={signature}"
-    return f"{S3_ENDPOINT}{path}?{final_qs}"
-
 def _rounded_mask(w, h, r):
     m = Image.new("L", (w, h), 0)
     d = ImageDraw.Draw(m)
     d.rounded_rectangle((0,0,w,h), r, fill=255)
     return m
 
-def _resize_cover(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
-    iw, ih = img.size
-    scale = max(target_w / iw, target_h / ih)
-    rs = img.resize((math.ceil(iw * scale), math.ceil(ih * scale)), Image.Resampling.LANCZOS)
-    rw, rh = rs.size
-    left = (rw - target_w) // 2
-    top  = (rh - target_h) // 2
-    return rs.crop((left, top, left + target_w, top + target_h))
-
-# ---- v2 레이아웃 합성 (시안 스타일) ----
-def _compose_card_v2(
-    bg_bytes: bytes,
-    thumb_bytes: bytes,
-    store_name: str,
-    district: str,
-    district_color: str = "#FF8601", 
-) -> bytes:
-    _ensure_font()
-    W, H = 1080, 1350
-    pad = 72
-    TITLE_TOP_OFFSET = 50
-    line_gap = 12
-    slot_w, slot_h = 860, 600
-    MIN_GAP = 10
-    CAPTION_SAFE_MARGIN = 150
-
-    canvas = Image.new("RGB", (W, H), "#000000")
-    bg = Image.open(io.BytesIO(bg_bytes))
-    bg = ImageOps.exif_transpose(bg)
-    bg = _resize_cover(bg, W, H)
-    canvas.paste(bg, (0, 0))
-    draw = ImageDraw.Draw(canvas)
-
-    title_w = W - pad * 2
-    district_font = _fit_font(district, title_w, 160, FONT_PATH_BOLD, 128, 32)
-    store_font    = _fit_font(store_name, title_w, 200, FONT_PATH_BOLD, 128, 32)
-
-    tx = (W - slot_w) // 2
-    ty = pad + TITLE_TOP_OFFSET
-    ty2 = ty + _text_wh(district_font, district)[1] + line_gap
-    title_bottom = ty2 + _text_wh(store_font, store_name)[1]
-
-    cap_top_y = H - CAPTION_SAFE_MARGIN
-    slot_x = (W - slot_w) // 2
-    slot_y = cap_top_y - slot_h - 145
-
-    if slot_y < title_bottom + MIN_GAP:
-        overlap = (title_bottom + MIN_GAP) - slot_y
-        ty -= overlap
-        ty2 = ty + _text_wh(district_font, district)[1] + line_gap
-        title_bottom = ty2 + _text_wh(store_font, store_name)[1]
-
-    draw.text((tx, ty), district, font=district_font, fill=district_color,
-              stroke_width=2, stroke_fill="#000000")  # 외곽선 추가하면 더 잘 보임
-    draw.text((tx, ty2), store_name, font=store_font, fill="#ffffff",
-              stroke_width=2, stroke_fill="#000000")
-
-    thumb = Image.open(io.BytesIO(thumb_bytes))
-    thumb = ImageOps.exif_transpose(thumb)
-    thumb = _resize_cover(thumb, slot_w, slot_h)
-    canvas.paste(thumb, (slot_x, slot_y))
-
-    out = io.BytesIO()
-    canvas.save(out, "WEBP", quality=92, method=6)
-    return out.getvalue()
+# ---- 공용 배경 캐시 ----
+# key -> {"etag", "version", "bytes", "checked_at"}
+# 디코드/리사이즈된 캔버스는 합성 워커가 version 별로 캐시한다. (compose_engine)
+_bg_cache: dict = {}
+_bg_lock = asyncio.Lock()
+
+async def _background_source(key: str = COMPOSE_BG_KEY) -> Tuple[str, bytes]:
+    """
+    배경 원본 바이트와 버전(ETag, 없으면 내용 해시)을 프로세스 내에 캐시한다.
+    재검증 주기가 지나면 ETag 로 조건부 GET 을 보내 304 면 그대로 쓰고, 200 이면 교체.
+    재검증이 실패해도 캐시가 있으면 그것을 쓴다.
+    """
+    async with _bg_lock:
+        now = time.monotonic()
+        cached = _bg_cache.get(key)
+        if cached and now - cached["checked_at"] < COMPOSE_BG_REVALIDATE_SEC:
+            return cached["version"], cached["bytes"]
+
+        try:
+            r = await storage.get(key, if_none_match=cached["etag"] if cached else None)
+        except (StorageError, httpx.HTTPError) as e:
+            if not cached:
+                raise HTTPException(502, f"배경 이미지 다운로드 실패: {e}")
+            print(f"[compose] 배경 재검증 실패, 캐시 사용: {e}", flush=True)
+            cached["checked_at"] = now
+            return cached["version"], cached["bytes"]
+
+        if r.status_code == 304:
+            cached["checked_at"] = now
+            return cached["version"], cached["bytes"]
+
+        etag = r.headers.get("ETag")
+        version = etag or hashlib.sha1(r.content).hexdigest()
+        _bg_cache[key] = {"etag": etag, "version": version, "bytes": r.content, "checked_at": now}
+        return version, r.content
+
+# ---- 합성 결과 캐시 ----
+# 같은 입력(이미지/문구/배경/템플릿 내용/레이아웃/인코더)이면 같은 키가 되므로, 이미 있으면 렌더/업로드를 건너뛴다.
+_known_cards: "OrderedDict[str, None]" = OrderedDict()
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _remember_card(key: str) -> None:
+    _known_cards[key] = None
+    _known_cards.move_to_end(key)
+    while len(_known_cards) > COMPOSE_INDEX_MAX:
+        _known_cards.popitem(last=False)
+
+def _card_key(prefix: str, profile: str, *, template: str, **inputs) -> str:
+    raw = json.dumps(
+        {**inputs, "template": template, "template_digest": template_digest(template),
+         "layout": LAYOUT_VERSION, "profile": profile},
+        ensure_ascii=False, sort_keys=True,
+    )
+    ext = output_meta(profile)[1]
+    return f"{prefix}/{hashlib.sha256(raw.encode()).hexdigest()[:40]}{ext}"
+
+async def _object_exists(key: str) -> bool:
+    try:
+        return await storage.head(key) is not None
+    except (StorageError, httpx.HTTPError):
+        return False
+
+async def _card_exists(key: str) -> bool:
+    if key in _known_cards:
+        _known_cards.move_to_end(key)
+        return True
+    if await _object_exists(key):
+        _remember_card(key)
+        return True
+    return False
+
+EncoderProfile = Literal["preview", "balanced", "archival", "jpeg", "avif"]
 
 class ComposeCardV2(BaseModel):
     image_key: str
     store_name: str
     area_keywords: List[str]
     session_id: Optional[str] = None
+    # preview(빠름) / balanced / archival(기본, 기존과 동일) / jpeg(progressive) / avif(미지원 시 balanced)
+    encoder_profile: Optional[EncoderProfile] = None
+    template: Optional[str] = None  # card_templates/ 이름 (v2_4x5 기본, v2_1x1, v2_9x16 ...)
 
-def compose_card_v2_core(payload: ComposeCardV2) -> dict:
-    """의존성(Depends) 없이 동작하는 순수 합성 함수"""
-    _ensure_font()
-
-    bg_key = "uploads/common/f465a025e7f540d1a850521bd9fc989e.jpg"
-    bg_url    = _presigned_get_url(bg_key)
-    thumb_url = _presigned_get_url(payload.image_key)
-
-    rb = requests.get(bg_url, timeout=20)
-    if rb.status_code != 200:
-        raise HTTPException(502, f"배경 이미지 다운로드 실패: {rb.status_code}")
-    rt = requests.get(thumb_url, timeout=20)
-    if rt.status_code != 200:
-        raise HTTPException(502, f"썸네일 이미지 다운로드 실패: {rt.status_code}")
-
-    district = _format_district(payload.area_keywords)
-    composed = _compose_card_v2(rb.content, rt.content, payload.store_name.strip(), district)
+class ComposeSlide(BaseModel):
+    image_key: str
+    layout: Literal["card", "photo"] = "card"   # card: 제목 카드, photo: 4:5 크롭만
+    store_name: Optional[str] = None            # 없으면 배치 공통값
+    area_keywords: Optional[List[str]] = None
+
+class ComposeBatch(BaseModel):
+    slides: List[ComposeSlide] = Field(..., min_length=1, max_length=10)  # 인스타 캐러셀 최대 10장
+    store_name: str = ""
+    area_keywords: List[str] = []
+    session_id: Optional[str] = None
+    encoder_profile: Optional[EncoderProfile] = None
+    template: Optional[str] = None  # 모든 슬라이드에 같은 비율/템플릿
+
+def _key_prefix(session_id: Optional[str]) -> str:
+    return f"composed_v2/{session_id or 'common'}".strip("/")
+
+def _resolve_template(name: Optional[str]) -> str:
+    name = name or DEFAULT_TEMPLATE
+    if name not in TEMPLATES:
+        raise HTTPException(400, f"알 수 없는 템플릿: {name}")
+    return name
+
+async def _download(key: str) -> bytes:
+    try:
+        return await storage.get_bytes(key)
+    except StorageError as e:
+        raise HTTPException(502, f"썸네일 이미지 다운로드 실패: {e.status}")
+    except httpx.HTTPError as e:
+        raise HTTPException(502, f"썸네일 이미지 다운로드 실패: {e}")
+
+async def _upload(key: str, data: bytes, content_type: str) -> None:
+    try:
+        await storage.put(key, data, content_type)
+    except StorageError as e:
+        raise HTTPException(500, f"S3 업로드 실패: {e.status} {e.detail}")
+    except httpx.HTTPError as e:
+        raise HTTPException(500, f"S3 업로드 실패: {e}")
+
+async def _compose_once(out_key: str, render) -> dict:
+    """
+    out_key 가 이미 있으면 그대로 돌려주고, 없으면 render() 로 만들어 업로드한다.
+    같은 키를 동시에 요청하면 한 번만 렌더/업로드하고 결과를 나눠 쓴다.
+    render: () -> awaitable (bytes, encode_meta)
+    """
+    if await _card_exists(out_key):
+        return {"ok": True, "rel": out_key, "url": storage.presigned_url(out_key, expires=600),
+                "cached": True, "encode": None}
+
+    while (pending := _inflight.get(out_key)) is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise  # 이 요청 자체가 취소됨
+            # 먼저 시작한 요청이 취소됨(클라이언트 끊김 등) → 이어서 직접 만든다
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[out_key] = fut
+    try:
+        try:
+            composed, enc = await render()
+        except ComposeBusy as e:
+            raise HTTPException(503, str(e))
+        await _upload(out_key, composed, enc["content_type"])
+        _remember_card(out_key)
+        result = {"ok": True, "rel": out_key, "url": storage.presigned_url(out_key, expires=600),
+                  "cached": False, "encode": enc}
+        fut.set_result(result)
+        return result
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # 기다리는 쪽이 없어도 경고가 남지 않게
+        raise
+    finally:
+        if not fut.done():
+            fut.cancel()  # CancelledError 등 Exception 이 아닌 이유로 빠져나감 → 기다리던 쪽을 깨운다
+        _inflight.pop(out_key, None)
+
+async def _compose_card(*, image_key: str, store_name: str, area_keywords: List[str],
+                        session_id: Optional[str], profile: str, template: str,
+                        bg: Tuple[str, bytes]) -> dict:
+    bg_version, bg_bytes = bg
+    store_name = store_name.strip()
+    district = _format_district(area_keywords)
+    out_key = _card_key(
+        _key_prefix(session_id), profile,
+        image=image_key, store=store_name, district=district, bg=bg_version, template=template,
+    )
 
-    key_prefix = f"composed_v2/{payload.session_id or 'common'}".strip("/")
-    out_key  = f"{key_prefix}/{uuid.uuid4().hex}.webp"
-    path = f"/{S3_BUCKET}/{out_key}"
-    url  = f"{S3_ENDPOINT}{path}"
-    headers = _aws_v4_sign(path, composed, "image/webp")
-    pu = requests.put(url, data=composed, headers=headers, timeout=20)
-    if pu.status_code not in (200, 201):
-        raise HTTPException(500, f"S3 업로드 실패: {pu.status_code} {pu.text}")
+    async def render():
+        # 사진 슬롯(최대 860px)은 feed 파생본(짧은 변 1080)으로 충분하다. 없으면 원본
+        thumb = await _download((await feed_keys([image_key]))[image_key])
+        return await compose_engine.render(
+            bg_version=bg_version, bg_bytes=bg_bytes, thumb_bytes=thumb,
+            store_name=store_name, district=district, encoder_profile=profile, template=template,
+        )
+    return await _compose_once(out_key, render)
+
+async def _compose_photo(*, image_key: str, session_id: Optional[str], profile: str, template: str) -> dict:
+    out_key = _card_key(_key_prefix(session_id), profile, image=image_key, slide="photo", template=template)
+
+    async def render():
+        return await compose_engine.render_photo(
+            photo_bytes=await _download(image_key), encoder_profile=profile, template=template,
+        )
+    return await _compose_once(out_key, render)
+
+async def compose_card_v2_core(payload: ComposeCardV2) -> dict:
+    """의존성(Depends) 없이 동작하는 합성 함수. 렌더링은 compose_engine 워커에서 돈다."""
+    _ensure_font()
+    return await _compose_card(
+        image_key=payload.image_key,
+        store_name=payload.store_name,
+        area_keywords=payload.area_keywords,
+        session_id=payload.session_id,
+        profile=resolve_profile(payload.encoder_profile),
+        template=_resolve_template(payload.template),
+        bg=await _background_source(),
+    )
 
-    presigned_url = _presigned_get_url(out_key, expires=600)
-    return {"ok": True, "rel": out_key, "url": presigned_url}
+async def compose_batch_core(payload: ComposeBatch) -> dict:
+    """
+    캐러셀 전체를 한 번에 합성. 슬라이드별 다운로드 → 렌더 → 업로드를 동시에 돌리므로
+    전체 시간은 합이 아니라 가장 느린 슬라이드 정도가 된다. (렌더 동시성은 compose_engine 이 제한)
+    결과는 요청 순서대로, 실패한 슬라이드는 ok=False 로 표시한다.
+    """
+    _ensure_font()
+    profile = resolve_profile(payload.encoder_profile)
+    template = _resolve_template(payload.template)
+    bg = None
+    if any(s.layout == "card" for s in payload.slides):
+        bg = await _background_source()
+
+    def one(slide: ComposeSlide):
+        if slide.layout == "photo":
+            return _compose_photo(image_key=slide.image_key, session_id=payload.session_id,
+                                  profile=profile, template=template)
+        return _compose_card(
+            image_key=slide.image_key,
+            store_name=slide.store_name if slide.store_name is not None else payload.store_name,
+            area_keywords=slide.area_keywords if slide.area_keywords is not None else payload.area_keywords,
+            session_id=payload.session_id, profile=profile, template=template, bg=bg,
+        )
+
+    results = await asyncio.gather(*(one(s) for s in payload.slides), return_exceptions=True)
+    slides = []
+    for slide, r in zip(payload.slides, results):
+        if isinstance(r, BaseException):
+            detail = r.detail if isinstance(r, HTTPException) else str(r)
+            slides.append({"ok": False, "image_key": slide.image_key, "error": detail})
+        else:
+            slides.append({**r, "image_key": slide.image_key})
+    return {
+        "ok": all(s["ok"] for s in slides),
+        "keys": [s.get("rel") for s in slides],
+        "slides": slides,
+    }
 
 @router.post("/compose/card")
-def compose_card_v2(payload: ComposeCardV2 = Body(...)):
-    return compose_card_v2_core(payload)
+async def compose_card_v2(payload: ComposeCardV2 = Body(...)):
+    return await compose_card_v2_core(payload)
+
+@router.post("/compose/batch")
+async def compose_batch(payload: ComposeBatch = Body(...)):
+    return await compose_batch_core(payload)
+
+@router.get("/compose/templates")
+async def compose_templates():
+    """사용할 수 있는 카드 템플릿 (이름/크기/설명)"""
+    return [
+        {"name": t["name"], "size": t["size"], "description": t.get("description", ""),
+         "default": t["name"] == DEFAULT_TEMPLATE}
+        for t in TEMPLATES.values()
+    ]
+
+@router.get("/compose/encoder/stats")
+async def compose_encoder_stats(current_user = Depends(get_current_user)):
+    """인코더 프로필별 평균 인코드 시간/출력 크기 (관리자 전용)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="관리자만 조회할 수 있습니다.")
+    return encoder_stats()
 
 
 def _format_district(area_keywords: List[str]) -> str:
@@ -1,17 +1,25 @@
 # backend/app/api/files.py
-import os, uuid, hmac, hashlib, mimetypes, re
+import os, uuid, asyncio, mimetypes, re
 from datetime import datetime, timezone
-import requests
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from typing import List, Optional
-import urllib.parse
+import httpx
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Body, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Literal
 
 from app.api.auth import get_current_user
+from app.db.database import get_session
+from app.repository.upload_repo import UploadRepo
+from app.services.object_storage import storage, StorageError, ObjectTooLarge
+from app.services.upload_processing import processor as upload_processor
 
 router = APIRouter()
 
 ALLOWED_MIME = {"image/jpeg", "image/png", "image/webp"}
 MAX_SIZE_MB = int(os.getenv("MAX_SIZE_MB", "10"))
+UPLOAD_CHUNK = 1024 * 1024  # UploadFile 에서 한 번에 읽는 크기
+FILES_UPLOAD_CONCURRENCY = int(os.getenv("FILES_UPLOAD_CONCURRENCY", "4"))  # 요청 하나에서 동시에 올리는 파일 수
+PRESIGNED_UPLOAD_EXPIRES = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SEC", "900"))  # 직접 업로드 URL 유효 시간
 
 S3_BUCKET = os.getenv("S3_BUCKET", "pium-dev")
 S3_REGION = os.getenv("S3_REGION", "kr-standard")
@@ -51,48 +59,50 @@ def _sanitize_subdir(subdir: Optional[str]) -> Optional[str]:
         safe.append(p)
     return "/".join(safe) if safe else None
 
-def _aws_v4_sign(path: str, body: bytes, content_type: str):
-    service = "s3"
-    algorithm = "AWS4-HMAC-SHA256"
-    now = datetime.now(timezone.utc)
-    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
-    date_stamp = now.strftime("%Y%m%d")
-    credential_scope = f"{date_stamp}/{S3_REGION}/{service}/aws4_request"
-
-    payload_hash = hashlib.sha256(body).hexdigest()
-    host = S3_ENDPOINT.replace("https://","").replace("http://","")
-
-    canonical_headers = (
-        f"host:{host}\n"
-        f"x-amz-content-sha256:{payload_hash}\n"
-        f"x-amz-date:{amz_date}\n"
-    )
-    signed_headers = "host;x-amz-content-sha256;x-amz-date"
-    canonical_request = f"PUT\n{path}\n\n{canonical_headers}\n{signed_headers}\n{payload_hash}"
-    string_to_sign = (
-        f"{algorithm}\n{amz_date}\n{credential_scope}\n"
-        f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
-    )
-
-    def _sign(key: bytes, msg: str) -> bytes:
-        import hmac as _hmac
-        return _hmac.new(key, msg.encode(), hashlib.sha256).digest()
-
-    k_date = _sign(("AWS4" + S3_SECRET_KEY).encode(), date_stamp)
-    k_region = _sign(k_date, S3_REGION)
-    k_service = _sign(k_region, service)
-    k_signing = _sign(k_service, "aws4_request")
-    signature = hmac.new(k_signing, string_to_sign.encode(), hashlib.sha256).hexdigest()
+def _key_prefix(user_id: int, subdir: Optional[str]) -> str:
+    """user-{id}/YYYY/MM/DD[/subdir]"""
+    today = datetime.now(timezone.utc)
+    user_root = f"user-{user_id}/{today:%Y/%m/%d}"
+    subdir = _sanitize_subdir(subdir)
+    return f"{user_root}/{subdir}" if subdir else user_root
+
+def _new_key(key_prefix: str, filename: Optional[str], content_type: str) -> str:
+    return f"{key_prefix}/{uuid.uuid4().hex}{_ext(filename, content_type)}"
+
+def _public_url(key: str) -> Optional[str]:
+    return f"{MEDIA_BASE_URL.rstrip('/')}/{key}" if MEDIA_BASE_URL else None
+
+async def _chunks(f: UploadFile):
+    while chunk := await f.read(UPLOAD_CHUNK):
+        yield chunk
+
+async def _upload_one(f: UploadFile, key_prefix: str, max_bytes: int, slots: asyncio.Semaphore) -> dict:
+    """파일 하나 업로드. 실패해도 예외 대신 {"ok": False, ...} 로 돌려준다 (다른 파일은 계속 진행)"""
+    key = _new_key(key_prefix, f.filename, f.content_type)
+
+    async with slots:
+        # 읽으면서 바로 올린다 (작으면 단일 PUT, 크면 멀티파트). 크기 제한도 읽는 도중에 검사
+        try:
+            put = await storage.put_stream(key, _chunks(f), f.content_type, max_bytes=max_bytes)
+        except ObjectTooLarge:
+            return {"ok": False, "filename": f.filename, "status": 413,
+                    "error": f"파일이 {MAX_SIZE_MB}MB를 초과합니다."}
+        except StorageError as e:
+            return {"ok": False, "filename": f.filename, "status": e.status, "error": e.detail[:500]}
+        except httpx.HTTPError as e:
+            return {"ok": False, "filename": f.filename, "status": 502, "error": str(e)}
 
-    auth = (
-        f"{algorithm} Credential={S3_ACCESS_KEY}/{credential_scope}, "
-        f"SignedHeaders={signed_headers}, Signature={signature}"
-    )
     return {
-        "Authorization": auth,
-        "x-amz-date": amz_date,
-        "x-amz-content-sha256": payload_hash,
-        "Content-Type": content_type,
+        "ok": True,
+        "filename": key.rsplit("/", 1)[-1],
+        "content_type": f.content_type,
+        "size": put["size"],
+        "sha256": put["sha256"],
+        "etag": put["etag"],
+        "url": _public_url(key),
+        "rel": key,
+        "backend": "ncp-object-storage",
+        "derivatives": "queued",
     }
 
 @router.post("/files/upload")
@@ -100,50 +110,187 @@ async def upload_files(
     files: List[UploadFile] = File(...),
     subdir: Optional[str] = None,                               # ⬅️ session_id 제거
     current_user = Depends(get_current_user),                    # ⬅️ 인증 필수
+    db: AsyncSession = Depends(get_session),
 ):
+    """
+    1) 모든 파일의 MIME/크기를 먼저 검사하고, 하나라도 걸리면 아무것도 올리지 않는다.
+    2) FILES_UPLOAD_CONCURRENCY 개씩 동시에 업로드. 결과는 요청 순서대로,
+       실패한 파일은 ok=False 로 표시하고 성공한 업로드는 그대로 둔다. (전부 실패하면 502)
+    3) 성공한 파일은 UploadedObject 로 기록하고 파생본 생성을 큐에 넣는다. (/files/derivatives 로 확인)
+    """
     _chk_env()
-    saved = []
-
-    today = datetime.now(timezone.utc)
-    user_root = f"user-{current_user.id}/{today:%Y/%m/%d}"
-
-    subdir = _sanitize_subdir(subdir)
-    key_prefix = f"{user_root}/{subdir}" if subdir else user_root
+    key_prefix = _key_prefix(current_user.id, subdir)
 
+    max_bytes = MAX_SIZE_MB * 1024 * 1024
     for f in files:
         _ensure_allowed(f.content_type)
+        if f.size is not None and f.size > max_bytes:
+            raise HTTPException(413, f"{f.filename}: 파일이 {MAX_SIZE_MB}MB를 초과합니다.")
+
+    slots = asyncio.Semaphore(FILES_UPLOAD_CONCURRENCY)
+    saved = await asyncio.gather(*(_upload_one(f, key_prefix, max_bytes, slots) for f in files))
 
-        size = 0
-        buf = bytearray()
-        while chunk := await f.read(1024 * 1024):
-            size += len(chunk)
-            if size > MAX_SIZE_MB * 1024 * 1024:
-                raise HTTPException(413, f"파일이 {MAX_SIZE_MB}MB를 초과합니다.")
-            buf.extend(chunk)
-
-        ext = _ext(f.filename, f.content_type)
-        final_name = f"{uuid.uuid4().hex}{ext}"
-        key = f"{key_prefix}/{final_name}"
-
-        path = f"/{S3_BUCKET}/{key}"
-        url = f"{S3_ENDPOINT}{path}"
-
-        headers = _aws_v4_sign(path, bytes(buf), f.content_type)
-        resp = requests.put(url, data=bytes(buf), headers=headers)
-        if resp.status_code not in (200, 201):
-            raise HTTPException(500, detail={"upload_failed": resp.text, "status": resp.status_code})
-
-        public_url = f"{MEDIA_BASE_URL.rstrip('/')}/{key}" if MEDIA_BASE_URL else None
-        saved.append({
-            "filename": final_name,
-            "content_type": f.content_type,
-            "size": size,
-            "url": public_url,
-            "rel": key,
-            "backend": "ncp-object-storage",
-        })
-
-    return {"ok": True, "files": saved}
+    if not any(r["ok"] for r in saved):
+        raise HTTPException(502, detail={"upload_failed": saved})
+
+    done = [r for r in saved if r["ok"]]
+    await UploadRepo.create_uploaded_bulk(
+        db, user_id=current_user.id,
+        items=[{"key": r["rel"], "content_type": r["content_type"], "size": r["size"], "etag": r["etag"]}
+               for r in done],
+    )
+    await db.commit()
+    upload_processor.enqueue([r["rel"] for r in done])
+    return {"ok": all(r["ok"] for r in saved), "files": saved}
+
+# ---- 브라우저 → 스토리지 직접 업로드 ----
+class PresignFile(BaseModel):
+    filename: Optional[str] = None
+    content_type: str
+    size: int = Field(..., gt=0)   # 선언 크기 (실제 크기는 finalize 에서 HEAD 로 다시 확인)
+
+class PresignUploadRequest(BaseModel):
+    files: List[PresignFile] = Field(..., min_length=1, max_length=10)
+    subdir: Optional[str] = None
+    # put : presigned PUT URL (Content-Type 헤더를 그대로 보내야 함)
+    # post: presigned POST 정책 (Content-Type/크기 범위를 스토리지가 검사)
+    method: Literal["put", "post"] = "put"
+
+class FinalizeUploadRequest(BaseModel):
+    keys: List[str] = Field(..., min_length=1, max_length=10)
+
+@router.post("/files/presign-upload")
+async def presign_upload(
+    payload: PresignUploadRequest = Body(...),
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    업로드 바이트가 API 서버를 거치지 않도록, 파일별로 스토리지에 직접 올릴 URL 을 발급한다.
+    키는 upload_files 와 같은 user-{id}/YYYY/MM/DD[/subdir] 아래. 올린 뒤 /files/finalize 로 확정해야 한다.
+    """
+    _chk_env()
+    max_bytes = MAX_SIZE_MB * 1024 * 1024
+    for f in payload.files:
+        _ensure_allowed(f.content_type)
+        if f.size > max_bytes:
+            raise HTTPException(413, f"{f.filename}: 파일이 {MAX_SIZE_MB}MB를 초과합니다.")
+
+    key_prefix = _key_prefix(current_user.id, payload.subdir)
+    uploads = []
+    for f in payload.files:
+        key = _new_key(key_prefix, f.filename, f.content_type)
+        if payload.method == "post":
+            target = {"method": "POST",
+                      **storage.presigned_post(key, f.content_type, max_bytes, expires=PRESIGNED_UPLOAD_EXPIRES)}
+        else:
+            headers = {"Content-Type": f.content_type}
+            target = {"method": "PUT", "headers": headers,
+                      "url": storage.presigned_url(key, PRESIGNED_UPLOAD_EXPIRES, "PUT", headers=headers)}
+        uploads.append({"filename": f.filename, "rel": key, "content_type": f.content_type, **target})
+
+    await UploadRepo.create_pending_bulk(
+        db, user_id=current_user.id,
+        items=[{"key": u["rel"], "content_type": u["content_type"]} for u in uploads],
+    )
+    await db.commit()
+    return {"ok": True, "expires_in": PRESIGNED_UPLOAD_EXPIRES, "uploads": uploads}
+
+async def _check_uploaded(obj, max_bytes: int):
+    """
+    HEAD 로 실제 객체를 확인. 조건 위반 객체는 지운다.
+    반환: (응답 항목, DB 에 반영할 값 또는 None)
+    """
+    if obj.status == "ready":
+        return {"ok": True, "rel": obj.key, "url": _public_url(obj.key), "content_type": obj.content_type,
+                "size": obj.size, "etag": obj.etag}, None
+    try:
+        head = await storage.head(obj.key)
+    except (StorageError, httpx.HTTPError) as e:
+        return {"ok": False, "rel": obj.key, "status": 502, "error": str(e)}, None
+    if head is None:
+        return {"ok": False, "rel": obj.key, "status": 409, "error": "아직 업로드되지 않았습니다."}, None
+
+    size = int(head.get("Content-Length", "0"))
+    content_type = head.get("Content-Type", "").split(";")[0].strip()
+    now = datetime.now(timezone.utc)
+    error = None
+    if content_type != obj.content_type:
+        error = (415, f"Content-Type 불일치: {content_type} (발급 시 {obj.content_type})")
+    elif size > max_bytes:
+        error = (413, f"파일이 {MAX_SIZE_MB}MB를 초과합니다.")
+    if error:
+        try:
+            await storage.delete(obj.key)
+        except (StorageError, httpx.HTTPError) as e:
+            print(f"[files] 거부된 객체 삭제 실패 {obj.key}: {e}", flush=True)
+        return ({"ok": False, "rel": obj.key, "status": error[0], "error": error[1]},
+                {"status": "rejected", "size": size, "finalized_at": now})
+
+    etag = head.get("ETag")
+    return ({"ok": True, "rel": obj.key, "url": _public_url(obj.key), "content_type": content_type,
+             "size": size, "etag": etag},
+            {"status": "ready", "size": size, "etag": etag, "finalized_at": now, "derivatives_status": "queued"})
+
+@router.post("/files/finalize")
+async def finalize_upload(
+    payload: FinalizeUploadRequest = Body(...),
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    presign-upload 로 올린 객체를 확정. 본인에게 발급된 키만 받고, HEAD 로 존재/크기/Content-Type 을 확인해 기록한다.
+    결과는 요청 순서대로 파일별 ok 로 (upload_files 응답과 같은 rel/url 필드).
+    """
+    _chk_env()
+    objs = await UploadRepo.get_by_keys(db, user_id=current_user.id, keys=payload.keys)
+    max_bytes = MAX_SIZE_MB * 1024 * 1024
+
+    async def one(key: str):
+        obj = objs.get(key)
+        if obj is None:
+            return {"ok": False, "rel": key, "status": 404, "error": "발급되지 않은 키입니다."}, None
+        return await _check_uploaded(obj, max_bytes)
+
+    # HEAD 는 동시에, DB 갱신은 한 세션이므로 끝난 뒤 차례로
+    checked = await asyncio.gather(*(one(k) for k in payload.keys))
+    for key, (_, values) in zip(payload.keys, checked):
+        if values:
+            await UploadRepo.update_object(db, object_id=objs[key].id, **values)
+    await db.commit()
+    upload_processor.enqueue([k for k, (_, v) in zip(payload.keys, checked) if v and v["status"] == "ready"])
+    files = [item for item, _ in checked]
+    return {"ok": all(f["ok"] for f in files), "files": files}
+
+@router.get("/files/derivatives")
+async def list_derivatives(
+    keys: List[str] = Query(..., max_length=50),
+    expires: int = 600,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    업로드별 파생본 상태와 URL. (갤러리/미리보기는 thumb + blurhash/lqip 로 그리고, 원본은 필요할 때만)
+    결과는 요청 순서대로. 파생본 URL 은 presigned URL 캐시를 거치므로 같은 목록을 다시 불러도 서명 비용이 거의 없다.
+    """
+    objs = await UploadRepo.get_by_keys(db, user_id=current_user.id, keys=keys)
+    ready = {k: o.derivatives for k, o in objs.items() if o.derivatives_status == "ready" and o.derivatives}
+    rels = [ready[k][n]["rel"] for k in ready for n in ready[k] if isinstance(ready[k][n], dict)]
+    urls = dict(zip(rels, storage.presigned_urls(rels, expires=expires))) if rels else {}
+
+    files = []
+    for key in keys:
+        obj = objs.get(key)
+        if obj is None:
+            files.append({"ok": False, "rel": key, "status": 404, "error": "업로드 기록이 없습니다."})
+            continue
+        item = {"ok": True, "rel": key, "status": obj.status, "derivatives": obj.derivatives_status}
+        d = ready.get(key)
+        if d:
+            for name, v in d.items():
+                item[name] = {**v, "url": _public_url(v["rel"]) or urls[v["rel"]]} if isinstance(v, dict) else v
+        files.append(item)
+    return {"files": files}
 
 @router.get("/files/presigned-get")
 def presigned_get(key: str, expires: int = 600, current_user = Depends(get_current_user)):
@@ -154,46 +301,6 @@ def presigned_get(key: str, expires: int = 600, current_user = Depends(get_curre
     if not key.startswith(user_prefix):
         raise HTTPException(403, "권한이 없습니다.")
 
-    service = "s3"
-    algorithm = "AWS4-HMAC-SHA256"
-    now = datetime.now(timezone.utc)
-    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
-    date_stamp = now.strftime("%Y%m%d")
-    credential_scope = f"{date_stamp}/{S3_REGION}/{service}/aws4_request"
-    host = S3_ENDPOINT.replace("https://","").replace("http://","")
-    path = f"/{S3_BUCKET}/{key}"
-
-    qs = {
-        "X-Amz-Algorithm": algorithm,
-        "X-Amz-Credential": f"{S3_ACCESS_KEY}/{credential_scope}",
-        "X-Amz-Date": amz_date,
-        "X-Amz-Expires": str(expires),
-        "X-Amz-SignedHeaders": "host",
-    }
-    canonical_query = "&".join(
-        f"{urllib.parse.quote(k, safe='~')}={urllib.parse.quote(v, safe='~')}"
-        for k, v in sorted(qs.items())
-    )
-
-    canonical_headers = f"host:{host}\n"
-    signed_headers = "host"
-    payload_hash = "UNSIGNED-PAYLOAD"
-
-    canonical_request = f"GET\n{path}\n{canonical_query}\n{canonical_headers}\n{signed_headers}\n{payload_hash}"
-    string_to_sign = (
-        f"{algorithm}\n{amz_date}\n{credential_scope}\n"
-        f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
-    )
-
-    def _sign(key: bytes, msg: str) -> bytes:
-        return hmac.new(key, msg.encode(), hashlib.sha256).digest()
-
-    k_date = _sign(("AWS4" + S3_SECRET_KEY).encode(), date_stamp)
-    k_region = _sign(k_date, S3_REGION)
-    k_service = _sign(k_region, service)
-    k_signing = _sign(k_service, "aws4_request")
-    signature = hmac.new(k_signing, string_to_sign.encode(), hashlib.sha256).hexdigest()
-
-    final_qs = canonical_query + f"&X-Amz-Signature={signature}"
-    url = f"{S3_ENDPOINT}{path}?{final_qs}"
-    return {"url": url, "expires_in": expires}
+    # 캐시된 URL 이면 남은 수명이 expires 와 다르므로 실제 값을 돌려준다
+    url, expires_in = storage.cached_presigned_urls([key], expires=expires)[0]
+    return {"url": url, "expires_in": expires_in}
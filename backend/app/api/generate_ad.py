@@ -1,13 +1,18 @@
 # backend/app/api/generate_ad.py
-from fastapi import APIRouter, HTTPException, Depends, Body
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+import json
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Optional, Dict, Any, Literal
 from sqlalchemy.ext.asyncio import AsyncSession
-from anyio import to_thread
 
 from app.schemas.GA_schemas import GenerateAdRequest
-from app.services.GA_Service import generate_ad_copy
-from app.db.database import get_session
+from app.services.GA_Service import generate_ad_copy, stream_ad_copy
+from app.services.batch_service import submit_batch_job, job_status
+from app.services import model_router
+from app.services import job_queue
+from app.api.tosspayments import plan_for_user
+from app.db.database import get_session, AsyncSessionLocal
 from app.repository.ad_repo import AdRepo
 from app.api.compose import compose_card_v2_core as compose_card_core, ComposeCardV2 as ComposeInput
 from app.api.instagram import PublishRequest as IgPublishRequest, ig_publish_core
@@ -19,6 +24,9 @@ class ChooseRequest(BaseModel):
     variant_id: str
     content: str
 
+class BatchGenerateRequest(BaseModel):
+    briefs: List[GenerateAdRequest] = Field(..., min_length=1, max_length=500)
+
 class PublishRequest(BaseModel):
     variant_id: str
     content: Optional[str] = None
@@ -31,12 +39,32 @@ class PublishRequest(BaseModel):
 @router.post("/generate")
 async def generate(
     request: GenerateAdRequest,
+    mode: Literal["sync", "job"] = Query("sync"),
+    callback_url: Optional[HttpUrl] = Query(None),
     db: AsyncSession = Depends(get_session),
     current_user = Depends(get_current_user),
 ):
+    if mode == "job":
+        # 큐에 넣고 즉시 반환 → GET /generate/jobs/{job_id} 로 폴링 (또는 callback_url 로 통지)
+        if callback_url:
+            try:
+                await job_queue.check_callback_url(str(callback_url))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        job = await job_queue.submit_job(
+            user_id=current_user.id,
+            plan=plan_for_user(current_user.id),
+            request=request.model_dump(mode="json"),
+            callback_url=str(callback_url) if callback_url else None,
+        )
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job["id"], "status": job["status"], "status_url": f"/api/generate/jobs/{job['id']}"},
+        )
+
     try:
         # 1) 카피 생성
-        out = await generate_ad_copy(request)
+        out = await generate_ad_copy(request, plan=plan_for_user(current_user.id))
 
         # 2) 요청 payload 저장 (user_id 기준)
         payload = request.model_dump(mode="json", exclude_none=True)
@@ -53,7 +81,94 @@ async def generate(
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_stream(
+    request: GenerateAdRequest,
+    current_user = Depends(get_current_user),
+):
+    """
+    캡션이 완성될 때마다 SSE(text/event-stream)로 하나씩 전송한다.
+    - event: request  → {"request_id"}
+    - event: variant  → {"index", "id", "content"}  (DB 저장/커밋 후 전송하므로 바로 /choose 가능)
+    - event: done     → {"count"}
+    - event: error    → {"detail"}
+    응답이 스트리밍되는 동안 세션을 유지해야 하므로 Depends(get_session) 대신 직접 연다.
+    """
+    user_id = current_user.id
+    plan = plan_for_user(user_id)
+    payload = request.model_dump(mode="json", exclude_none=True)
+
+    async def events():
+        async with AsyncSessionLocal() as db:
+            try:
+                req_id = await AdRepo.save_request(db, user_id=user_id, payload=payload)
+                await db.commit()
+                yield _sse("request", {"request_id": req_id})
+
+                count = 0
+                async for v in stream_ad_copy(request, plan=plan):
+                    await AdRepo.save_variants(db, request_id=req_id, variants=[v], start_index=count)
+                    await db.commit()
+                    yield _sse("variant", {"index": count, **v})
+                    count += 1
+                yield _sse("done", {"count": count})
+            except Exception as e:
+                await db.rollback()
+                yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/generate/jobs/{job_id}")
+async def get_generate_job(job_id: str, current_user = Depends(get_current_user)):
+    job = await job_queue.get_job(job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="생성 작업을 찾을 수 없습니다.")
+    return job_queue.public_view(job)
+
+
+@router.get("/generate/models/stats")
+async def generate_model_stats(current_user = Depends(get_current_user)):
+    """모델별 호출 수/오류율/p95 및 지연 히스토그램 (관리자 전용)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="관리자만 조회할 수 있습니다.")
+    return model_router.stats()
+
+
+@router.post("/generate/batch")
+async def generate_batch(
+    req: BatchGenerateRequest,
+    db: AsyncSession = Depends(get_session),
+    current_user = Depends(get_current_user),
+):
+    """여러 브리프를 Batch API 로 제출 (결과는 수 분~수 시간 뒤). 진행 상황은 GET /generate/batch/{job_id}"""
+    try:
+        job = await submit_batch_job(db, user_id=current_user.id, briefs=req.briefs)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"batch submit failed: {e}")
+    return job_status(job)
+
+@router.get("/generate/batch/{job_id}")
+async def get_batch(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user = Depends(get_current_user),
+):
+    job = await AdRepo.get_batch_job(db, job_id=job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="배치 작업을 찾을 수 없습니다.")
+    return job_status(job)
+
 
 @router.post("/choose")
 async def choose(
@@ -138,7 +253,7 @@ async def choose_and_publish(
             store_name=store_name,
             area_keywords=[str(x).strip() for x in area_keywords if str(x).strip()],
         )
-        comp_out = await to_thread.run_sync(compose_card_core, comp_in)
+        comp_out = await compose_card_core(comp_in)
         cover_key = comp_out.get("rel")
         if cover_key:
             final_image_keys = [cover_key] + final_image_keys[1:]
@@ -6,13 +6,14 @@ import os
 import httpx
 import json
 from datetime import datetime, timezone
-import hmac, hashlib
 from typing import Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_session
 from app.repository.ad_repo import AdRepo
 from dotenv import load_dotenv
 from app.api.auth import get_current_user  # 인증 유지
+from app.services.object_storage import storage
+from app.services.upload_processing import feed_keys
 import time
 
 load_dotenv()
@@ -23,54 +24,6 @@ IG_LATEST_TTL_SEC = int(os.getenv("IG_LATEST_TTL_SEC", "60"))     # 최신글 
 # username별 간단 캐시
 _latest_cache: dict[str, dict] = {}
 
-S3_BUCKET = os.getenv("S3_BUCKET")
-S3_REGION = os.getenv("S3_REGION", "kr-standard")
-S3_ENDPOINT = os.getenv("S3_ENDPOINT", "https://kr.object.ncloudstorage.com")
-S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
-S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
-
-def _sign(key: bytes, msg: str) -> bytes:
-    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
-
-def _presigned_get_url(key: str, expires: int = 900) -> str:
-    """NCP(Object Storage) presigned GET URL 생성. key = 'uploads/.../file.png'"""
-    service = "s3"
-    algorithm = "AWS4-HMAC-SHA256"
-    now = datetime.now(timezone.utc)
-    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
-    date_stamp = now.strftime("%Y%m%d")
-    credential_scope = f"{date_stamp}/{S3_REGION}/{service}/aws4_request"
-    host = S3_ENDPOINT.replace("https://","").replace("http://","")
-    path = f"/{S3_BUCKET}/{key}"
-
-    qs = {
-        "X-Amz-Algorithm": algorithm,
-        "X-Amz-Credential": f"{S3_ACCESS_KEY}/{credential_scope}",
-        "X-Amz-Date": amz_date,
-        "X-Amz-Expires": str(expires),
-        "X-Amz-SignedHeaders": "host",
-    }
-    import urllib.parse
-    canonical_query = "&".join(
-        f"{urllib.parse.quote(k, safe='~')}={urllib.parse.quote(v, safe='~')}"
-        for k, v in sorted(qs.items())
-    )
-    canonical_headers = f"host:{host}\n"
-    signed_headers = "host"
-    payload_hash = "UNSIGNED-PAYLOAD"
-    canonical_request = f"GET\n{path}\n{canonical_query}\n{canonical_headers}\n{signed_headers}\n{payload_hash}"
-    string_to_sign = (
-        f"{algorithm}\n{amz_date}\n{credential_scope}\n"
-        f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
-    )
-    k_date = _sign(("AWS4" + S3_SECRET_KEY).encode(), date_stamp)
-    k_region = _sign(k_date, S3_REGION)
-    k_service = _sign(k_region, service)
-    k_signing = _sign(k_service, "aws4_request")
-    signature = hmac.new(k_signing, string_to_sign.encode(), hashlib.sha256).hexdigest()
-    final_qs = canonical_query + f"&X-Amz-Signature={signature}"
-    return f"{S3_ENDPOINT}{path}?{final_qs}"
-
 router = APIRouter()
 
 IG_USER_ID = os.getenv("IG_USER_ID")
@@ -109,13 +62,18 @@ async def _resolve_caption(db: AsyncSession, req: PublishRequest, *, user_id: in
         
     raise HTTPException(status_code=400, detail="caption 또는 session_id 중 하나는 필요합니다.")
 
+async def _image_urls_for_keys(keys: List[str]) -> List[str]:
+    """업로드 원본 대신 feed 파생본(1080px JPEG)이 있으면 그쪽 URL 을 넘긴다. 인스타그램이 받아 가는 바이트가 작아진다"""
+    feed = await feed_keys(keys)
+    return storage.presigned_urls([feed[k] for k in keys], expires=900)
+
 async def ig_publish_core(req: PublishRequest, db: AsyncSession):
     caption = req.caption.strip() if (req.caption and req.caption.strip()) else await _resolve_caption(db, req)
 
     if req.dry_run:
         if not req.image_urls and not req.image_keys:
             raise HTTPException(status_code=400, detail="image_urls 또는 image_keys 중 하나는 필요합니다.")
-        img_urls = [str(u) for u in req.image_urls] if req.image_urls else [_presigned_get_url(k, expires=900) for k in req.image_keys]
+        img_urls = [str(u) for u in req.image_urls] if req.image_urls else await _image_urls_for_keys(req.image_keys)
         return {
             "ok": True,
             "dry_run": True,
@@ -128,7 +86,7 @@ async def ig_publish_core(req: PublishRequest, db: AsyncSession):
     if not req.image_urls and not req.image_keys:
         raise HTTPException(status_code=400, detail="image_urls 또는 image_keys 중 하나는 필요합니다.")
 
-    img_urls = [str(u) for u in req.image_urls] if req.image_urls else [_presigned_get_url(k, expires=900) for k in req.image_keys]
+    img_urls = [str(u) for u in req.image_urls] if req.image_urls else await _image_urls_for_keys(req.image_keys)
 
     async with httpx.AsyncClient(timeout=60) as client:
         creation_ids = []
@@ -34,6 +34,22 @@ BILLING = {}       # customerKey -> {"billingKey": str, "userId": Optional[int]}
 SUBSCRIPTIONS = {} # customerKey -> {"plan": str, "amount": int, "interval": "MONTH", "nextBillingAt": str(ISO)}
 
 
+def plan_for_user(user_id: Optional[int]) -> Optional[str]:
+    """
+    유저의 구독 요금제 (없으면 None). 생성 모델 라우팅에 사용.
+    /billing/start 는 결제 전에 클라이언트가 보낸 plan 으로 SUBSCRIPTIONS 를 만들므로,
+    빌링 인증이 끝나 billingKey 가 발급됐거나 다음 결제일이 잡힌 구독만 인정한다.
+    """
+    if user_id is None:
+        return None
+    for customer_key, sub in SUBSCRIPTIONS.items():
+        if sub.get("userId") != user_id or sub.get("plan") in (None, "UNKNOWN"):
+            continue
+        if (BILLING.get(customer_key) or {}).get("billingKey") or sub.get("nextBillingAt"):
+            return sub["plan"]
+    return None
+
+
 class CreateOrderReq(BaseModel):
     order_id: str = Field(..., min_length=6, max_length=64)
     amount: int = Field(..., gt=0)
@@ -18,7 +18,8 @@ engine = create_async_engine(
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def init_models():
-    from app.models.ad import AdRequest, AdVariant, AdSelection
+    from app.models.ad import AdRequest, AdVariant, AdSelection, AdBatchJob
+    from app.models.upload import UploadedObject
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
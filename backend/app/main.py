@@ -12,6 +12,12 @@ from app.services.auth_service import AuthService
 from app.repository.user_repository import UserRepository
 from app.api.tosspayments import router as toss_router
 from app.api.inquiries import router as inquiries_router
+from app.services.GA_Service import aclose_openai
+from app.services.batch_service import resume_batch_jobs
+from app.services.job_queue import start_job_workers, stop_job_workers
+from app.services.compose_engine import start_compose_engine, stop_compose_engine
+from app.services.object_storage import aclose_storage
+from app.services.upload_processing import start_upload_processing, stop_upload_processing, resume_upload_processing
 
 
 app = FastAPI(title="Pium API", version="1.0.0")
@@ -70,6 +76,20 @@ async def on_startup():
     loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, _seed_sync_with_retry)
 
+    await resume_batch_jobs()
+    start_job_workers()
+    start_compose_engine()
+    start_upload_processing()
+    await resume_upload_processing()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_job_workers()
+    stop_compose_engine()
+    await stop_upload_processing()
+    await aclose_openai()
+    await aclose_storage()
+
 @app.get("/")
 async def root():
     return {"message": "Pium API에 오신 것을 환영합니다!"}
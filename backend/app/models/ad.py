@@ -33,4 +33,21 @@ class AdSelection(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, unique=True, index=True) 
     variant_id: Mapped[str] = mapped_column(String(64))
-    content: Mapped[str] = mapped_column(Text)
\ No newline at end of file
+    content: Mapped[str] = mapped_column(Text)
+
+class AdBatchJob(Base):
+    """여러 브리프를 OpenAI Batch API 로 한 번에 생성하는 비대화형 작업"""
+    __tablename__ = "ad_batch_job"
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, index=True)
+    status: Mapped[str] = mapped_column(String(32), default="queued")  # queued|submitted|in_progress|completed|failed
+    backend: Mapped[str] = mapped_column(String(32))
+    provider_batch_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    payloads: Mapped[list] = mapped_column(JSON)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    completed: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    request_ids: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,28 @@
+# app/models/upload.py
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, BigInteger, String, DateTime, JSON, func
+
+from app.models.base import Base
+
+
+class UploadedObject(Base):
+    """
+    업로드된 객체. /files/upload 로 올린 것은 바로 ready 로,
+    브라우저가 presigned URL 로 직접 올린 것은 발급 시 pending 으로 만들고 finalize 에서 HEAD 로 확인되면 ready
+    (조건 위반이면 rejected).
+    ready 가 되면 upload_processing 이 파생본(feed/thumb/blurhash/LQIP)을 만들어 derivatives 에 기록한다.
+    """
+    __tablename__ = "uploaded_object"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, index=True)
+    key: Mapped[str] = mapped_column(String(512), unique=True)
+    content_type: Mapped[str] = mapped_column(String(64))
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)       # finalize 시 HEAD 의 Content-Length
+    etag: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), default="pending")        # pending|ready|rejected
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finalized_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # {"feed": {"rel", "width", "height", "bytes"}, "thumb": {...}, "blurhash", "lqip"}
+    derivatives: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    derivatives_status: Mapped[str | None] = mapped_column(String(16), nullable=True, index=True)  # queued|ready|failed
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import List, Dict, Any
 from sqlalchemy import select, delete, desc, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.ad import AdRequest, AdVariant, AdSelection
+from app.models.ad import AdRequest, AdVariant, AdSelection, AdBatchJob
 
 class AdRepo:
     @staticmethod
@@ -25,9 +25,10 @@ class AdRepo:
         *,
         request_id: int,
         variants: List[Dict[str, Any]],
+        start_index: int = 0,
     ) -> None:
-        """생성된 카피 후보들 저장"""
-        for i, v in enumerate(variants or []):
+        """생성된 카피 후보들 저장 (스트리밍 시 start_index 로 순번 이어붙임)"""
+        for i, v in enumerate(variants or [], start=start_index):
             session.add(
                 AdVariant(
                     id=v.get("id") or v.get("variant_id"),   # 문자열 PK면 그대로, 숫자면 모델에 맞게 조정
@@ -38,6 +39,61 @@ class AdRepo:
             )
         await session.flush()
 
+    @staticmethod
+    async def save_requests_bulk(
+        session: AsyncSession,
+        *,
+        user_id: int,
+        payloads: List[Dict[str, Any]],
+    ) -> List[int]:
+        """여러 요청을 INSERT 한 번으로 저장, 입력 순서대로 id 반환"""
+        if not payloads:
+            return []
+        res = await session.execute(
+            insert(AdRequest).returning(AdRequest.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, "payload": p} for p in payloads],
+        )
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def save_variants_bulk(
+        session: AsyncSession,
+        *,
+        variants_by_request: Dict[int, List[Dict[str, Any]]],
+    ) -> None:
+        """request_id -> variants 묶음을 executemany 로 한 번에 저장"""
+        rows = [
+            {"id": v.get("id"), "request_id": rid, "index_no": i, "content": v.get("content")}
+            for rid, variants in variants_by_request.items()
+            for i, v in enumerate(variants or [])
+        ]
+        if rows:
+            await session.execute(insert(AdVariant), rows)
+
+    @staticmethod
+    async def create_batch_job(session: AsyncSession, *, job: AdBatchJob) -> AdBatchJob:
+        session.add(job)
+        await session.flush()
+        return job
+
+    @staticmethod
+    async def get_batch_job(session: AsyncSession, *, job_id: str, user_id: int | None = None):
+        q = select(AdBatchJob).where(AdBatchJob.id == job_id)
+        if user_id is not None:
+            q = q.where(AdBatchJob.user_id == user_id)
+        res = await session.execute(q)
+        return res.scalar_one_or_none()
+
+    @staticmethod
+    async def list_unfinished_batch_jobs(session: AsyncSession):
+        q = select(AdBatchJob).where(AdBatchJob.status.in_(("queued", "submitted", "in_progress")))
+        res = await session.execute(q)
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def update_batch_job(session: AsyncSession, *, job_id: str, **values) -> None:
+        await session.execute(update(AdBatchJob).where(AdBatchJob.id == job_id).values(**values))
+
     @staticmethod
     async def choose(
         session: AsyncSession,
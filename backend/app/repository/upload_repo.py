@@ -0,0 +1,70 @@
+# app/repository/upload_repo.py
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+from sqlalchemy import select, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.upload import UploadedObject
+
+class UploadRepo:
+    @staticmethod
+    async def create_pending_bulk(
+        session: AsyncSession,
+        *,
+        user_id: int,
+        items: List[Dict[str, Any]],
+    ) -> None:
+        """presigned URL 을 발급한 키들을 pending 으로 저장 (items: [{"key", "content_type"}])"""
+        if items:
+            await session.execute(
+                insert(UploadedObject),
+                [{"user_id": user_id, "key": i["key"], "content_type": i["content_type"], "status": "pending"}
+                 for i in items],
+            )
+
+    @staticmethod
+    async def create_uploaded_bulk(
+        session: AsyncSession,
+        *,
+        user_id: int,
+        items: List[Dict[str, Any]],
+    ) -> None:
+        """서버를 거쳐 이미 올라간 객체들을 ready 로 저장 (items: [{"key", "content_type", "size", "etag"}])"""
+        if items:
+            now = datetime.now(timezone.utc)
+            await session.execute(
+                insert(UploadedObject),
+                [{"user_id": user_id, "key": i["key"], "content_type": i["content_type"], "size": i["size"],
+                  "etag": i.get("etag"), "status": "ready", "finalized_at": now, "derivatives_status": "queued"}
+                 for i in items],
+            )
+
+    @staticmethod
+    async def get_by_keys(session: AsyncSession, *, user_id: int, keys: List[str]) -> Dict[str, UploadedObject]:
+        """유저 본인 객체만 key -> 행"""
+        q = select(UploadedObject).where(UploadedObject.user_id == user_id, UploadedObject.key.in_(keys))
+        res = await session.execute(q)
+        return {o.key: o for o in res.scalars().all()}
+
+    @staticmethod
+    async def update_object(session: AsyncSession, *, object_id: int, **values) -> None:
+        await session.execute(update(UploadedObject).where(UploadedObject.id == object_id).values(**values))
+
+    @staticmethod
+    async def update_by_key(session: AsyncSession, *, key: str, **values) -> None:
+        await session.execute(update(UploadedObject).where(UploadedObject.key == key).values(**values))
+
+    @staticmethod
+    async def list_keys_by_derivatives_status(session: AsyncSession, *, status: str) -> List[str]:
+        q = select(UploadedObject.key).where(UploadedObject.derivatives_status == status).order_by(UploadedObject.id)
+        res = await session.execute(q)
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def get_derivatives(session: AsyncSession, *, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """파생본이 준비된 키만 key -> derivatives"""
+        q = select(UploadedObject.key, UploadedObject.derivatives).where(
+            UploadedObject.key.in_(keys), UploadedObject.derivatives_status == "ready",
+        )
+        res = await session.execute(q)
+        return {k: d for k, d in res.all() if d}
@@ -29,4 +29,9 @@ class GenerateAdRequest(BaseModel):
     hashtag_limit: int = Field(default=15, ge=1, le=30)
 
     num_variants: int = Field(default=3, ge=1, le=5)
-    avoid_texts: Optional[List[str]] = None
\ No newline at end of file
+    avoid_texts: Optional[List[str]] = None
+
+    use_cache: bool = True  # False 면 동일 브리프라도 항상 새로 생성
+    fanout: bool = False    # True 면 캡션마다 별도 호출을 병렬로 보냄
+    quorum: Optional[int] = Field(default=None, ge=1, le=5)  # fan-out 시 이 개수만 모이면 반환 (기본: num_variants)
+    structured_output: bool = False  # True 면 JSON schema 로 {body, hashtags[]} 를 받음 (스트리밍은 구분자 포맷 고정)
\ No newline at end of file
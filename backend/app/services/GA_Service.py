@@ -1,12 +1,21 @@
 # backend/app/services/GA_Service.py
-import os, re
+import os, re, json
 import uuid
-from typing import List, Optional, Iterable, Dict, Any
-from anyio import to_thread
-from openai import OpenAI, OpenAIError
+import time
+import asyncio
+from typing import List, Optional, Iterable, Dict, Any, AsyncIterator, Tuple
+from openai import AsyncOpenAI, OpenAIError
 from dotenv import load_dotenv
 import httpx
 
+from app.services.generation_cache import cache_key, get_cached, set_cached
+from app.services.prompt_template import (
+    AD_PROMPT, OUTPUT_FORMAT_DELIMITED, OUTPUT_FORMAT_JSON, SECTION_BUDGETS,
+    count_tokens, fit_items, truncate_text,
+)
+from app.services.openai_limiter import limiter, call_with_retry, RateLimitQueueTimeout
+from app.services import model_router
+
 load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
@@ -14,7 +23,39 @@ api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise RuntimeError("OPENAI_API_KEY가 설정되어 있지 않습니다.")
 
-client = OpenAI(api_key=api_key)
+# ---- OpenAI HTTP 커넥션 풀 / 동시성 설정 ----
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SEC", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT_SEC", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SEC", "5"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "64"))  # 동시에 나가는 생성 호출 상한
+
+# fan-out 모드: 캡션마다 별도 호출, quorum 개가 모이면 반환하고 deadline 이 지나면 나머지는 취소
+GEN_FANOUT_DEADLINE_SEC = float(os.getenv("GEN_FANOUT_DEADLINE_SEC", "20"))
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+OPENAI_EST_OUTPUT_TOKENS = int(os.getenv("OPENAI_EST_OUTPUT_TOKENS", "1200"))  # TPM 버킷에서 미리 확보할 출력 토큰 추정치
+
+# 프로세스 전체가 공유하는 커넥션 풀 (keep-alive 로 TLS 핸드셰이크 재사용)
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    ),
+    timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+)
+# 재시도는 openai_limiter 가 담당하므로 SDK 자체 재시도는 끈다
+client = AsyncOpenAI(api_key=api_key, http_client=_http_client, max_retries=0)
+
+# 워커 스레드 대신 이벤트 루프에서 대기하므로, 상한은 세마포어로 건다
+_openai_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+async def aclose_openai() -> None:
+    """앱 종료 시 커넥션 풀 정리"""
+    await client.close()
 
 TONE_STYLE = {
     "Casual": "친근하고 일상적인 말투, 이모지 적절히 사용",
@@ -26,133 +67,405 @@ TONE_STYLE = {
 }
 
 DELIM = "\n<<<VARIANT_END>>>\n" 
+_OUTPUT_DELIMITED = OUTPUT_FORMAT_DELIMITED.render({"delim": DELIM.strip()})
 
-def _safe_join(items: Optional[Iterable], sep: str) -> str:
-    if not items:
-        return ""
-    return sep.join([str(x) for x in items if x is not None])
+# structured output 모드: 모델이 스키마에 맞는 JSON 만 내도록 강제
+VARIANTS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ad_variants",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "variants": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "body": {"type": "string"},
+                            "hashtags": {"type": "array", "items": {"type": "string"}},
+                        },
+                        "required": ["body", "hashtags"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["variants"],
+            "additionalProperties": False,
+        },
+    },
+}
 
+# fan-out 호출끼리 문안이 겹치지 않도록 캡션마다 다른 방향을 준다
+DIVERSITY_HINTS = [
+    "가게의 대표 메뉴/서비스를 첫 문장에 내세워 시작할 것",
+    "고객이 겪는 상황이나 고민으로 공감하며 시작할 것",
+    "진행 중인 혜택이나 방문해야 할 이유를 앞세울 것",
+    "가게 분위기와 공간의 느낌을 묘사하며 시작할 것",
+    "지역/상권 키워드를 활용해 동네 사람에게 말을 거는 느낌으로 시작할 것",
+]
 
 def _fmt_time(t) -> str:
     return t.strftime("%H:%M") if t else ""
 
-def _extract_hashtags(text: str) -> List[str]:
-    tags = re.findall(r"#([A-Za-z0-9가-힣_]+)", text)
-    seen, out = set(), []
-    for t in tags:
-        if t not in seen:
-            seen.add(t); out.append(t)
-    return out
+SYSTEM_PROMPT = "너는 인스타그램 광고 카피라이터야. 한국어로 쓰고, 지침을 엄격히 따른다."
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+def _estimate_tokens(prompt: str) -> int:
+    return count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) + OPENAI_EST_OUTPUT_TOKENS
+
+async def _call_openai(prompt: str, model: str = OPENAI_MODEL, temperature: float = OPENAI_TEMPERATURE,
+                       response_format: Optional[Dict[str, Any]] = None) -> str:
+    extra = {"response_format": response_format} if response_format else {}
+
+    async def _once():
+        started = time.monotonic()
+        try:
+            async with _openai_slots:
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=_messages(prompt),
+                    temperature=temperature,
+                    **extra,
+                )
+        except OpenAIError:
+            model_router.record(model, (time.monotonic() - started) * 1000, ok=False)
+            raise
+        model_router.record(model, (time.monotonic() - started) * 1000, ok=True)
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
 
-def _call_openai(prompt: str) -> str:
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "너는 인스타그램 광고 카피라이터야. 한국어로 쓰고, 지침을 엄격히 따른다."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-        )
+        resp = await call_with_retry(_once, tokens=_estimate_tokens(prompt))
         return resp.choices[0].message.content.strip()
-    except OpenAIError as e:
+    except (OpenAIError, RateLimitQueueTimeout) as e:
         print(f"[OpenAIError] {type(e).__name__}: {e}")
         raise RuntimeError(f"OpenAI 호출 실패: {e}")
 
+async def _stream_openai(prompt: str, model: str = OPENAI_MODEL, temperature: float = OPENAI_TEMPERATURE) -> AsyncIterator[str]:
+    """스트리밍 응답의 텍스트 조각(delta)을 순서대로 흘려보낸다."""
+    async def _open():
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=_messages(prompt),
+            temperature=temperature,
+            stream=True,
+        )
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
 
-def _build_prompt(req) -> str:
+    started = time.monotonic()
+    try:
+        async with _openai_slots:  # 스트림이 끝날 때까지 슬롯 점유
+            # 재시도는 스트림을 여는 단계까지만 (이미 보낸 캡션을 다시 받을 수는 없으므로)
+            stream = await call_with_retry(_open, tokens=_estimate_tokens(prompt))
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        model_router.record(model, (time.monotonic() - started) * 1000, ok=True)
+    except (OpenAIError, RateLimitQueueTimeout) as e:
+        model_router.record(model, (time.monotonic() - started) * 1000, ok=False)
+        print(f"[OpenAIError] {type(e).__name__}: {e}")
+        raise RuntimeError(f"OpenAI 호출 실패: {e}")
+
+
+def _render_prompt(req, num_variants: Optional[int] = None, hint: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    템플릿을 채워 (프롬프트, 토큰 사용 리포트)를 돌려준다.
+    num_variants/hint 는 fan-out 모드에서 캡션 1개짜리 프롬프트를 만들 때 사용
+    """
+    n = num_variants or req.num_variants
     tone_rule = TONE_STYLE.get(req.tone or "Casual", TONE_STYLE["Casual"])
-    area_kw = _safe_join(req.area_keywords, ", ")
-    ref_links = _safe_join(req.reference_links, "\n") or "없음"
-    ps_kw = _safe_join(req.product_service_keywords, ", ") or "미지정"
-    targets = _safe_join(req.target_customers, ", ") or "일반 대중"
-    promos = _safe_join(req.promotions, " / ") or "없음"
-    ig = f"@{req.instagram_id}" if req.instagram_id else "없음"
+    sections: Dict[str, int] = {}
+    truncated: List[str] = []
 
-    img_links = []
-    if req.image_urls:
-        img_links.extend([str(u) for u in req.image_urls])
+    def _items(name, items, sep, limit=None):
+        kept, used, cut = fit_items(items, sep, SECTION_BUDGETS[name], limit)
+        sections[name] = used
+        if cut:
+            truncated.append(name)
+        return kept
+
+    area_kw = ", ".join(_items("area_keywords", req.area_keywords, ", "))
+    ref_links = "\n".join(_items("reference_links", req.reference_links, "\n")) or "없음"
+    ps_kw = ", ".join(_items("product_service_keywords", req.product_service_keywords, ", ")) or "미지정"
+    targets = ", ".join(_items("target_customers", req.target_customers, ", ")) or "일반 대중"
+    promos = " / ".join(_items("promotions", req.promotions, " / ")) or "없음"
+    ig = f"@{req.instagram_id}" if req.instagram_id else "없음"
 
+    img_links = _items("image_urls", req.image_urls, ", ")
     img_hint = ("\n- 참고 이미지 링크: " + ", ".join(img_links)) if img_links else ""
 
     bh = f"{_fmt_time(req.business_hours.open)} ~ {_fmt_time(req.business_hours.close)}"
 
     avoid = ""
-    if req.avoid_texts:
-        avoid = "\n[피해야 할 문구/컨셉]\n- " + "\n- ".join(req.avoid_texts[:10])
-
-    return f"""
-[목표]
-인스타그램 피드용 광고 캡션 {req.num_variants}개를 작성한다.
-
-[브리프]
-- 가게명: {req.store_name}
-- 업종: {req.category}
-- 지역/상권 키워드: {area_kw}
-- 주소: {req.address}
-- 가격대: {req.price}
-- 영업 시간: {bh}
-- 가게 소개: {req.store_intro}
-- 제품/서비스 키워드: {ps_kw}
-- 타깃 고객: {targets}
-- 진행 중 프로모션/이벤트: {promos}
-- 인스타그램 ID: {ig}{img_hint}
-- 참고 링크:
-{ref_links}
-{avoid}
-
-[톤]
-{tone_rule}
-
-[작성 규칙]
-- 한국어, 300자 이내. 자연스럽게 지역/상권 키워드 최소 1개 포함.
-- 홍보글은 가게 특성과 고객에게 줄 가치가 명확히 드러나야 함
-- 해시태그는 검색 최적화(SEO) 관점에서 작성
-- 가게 특징(업종·메인 서비스)과 혜택/차별점을 1~2개로 명확히.
-- 이모지는 과하지 않게 핵심 위치에만 사용(톤에 맞게).
-- 금지: 과장된 단정(최고, 100% 보장, 완벽), 과도한 특수문자, 허위·건강 효능.
-- 해시태그는 마지막 줄에만, 띄어쓰기로 구분하여 정확히 {req.hashtag_limit}개 생성.
-- 해시태그는 #기호로만 시작하고 문장부호/이모지 금지.
-- 홍보글 밑, 해시태그 전 반드시 가게명과 가게 주소를 각각 📍 이모지 뒤에 표기할 것. (ex. 📍 묭이카페\n 📍 소행성 행성로 88-2)
-- 가게 인스타그램 아이디는 본문에 포함하지 말 것.
-
-[출력 포맷]
-다음 형식을 각 캡션마다 엄격히 따르고, 각 캡션 블록 끝에 '{DELIM.strip()}' 구분자를 붙인다.
-
-캡션 본문 한 문단
-빈 줄 1개
-#해시태그들(#으로 시작, 공백으로 구분)
-{DELIM.strip()}
-"""
+    avoid_items = _items("avoid_texts", req.avoid_texts, "\n- ", limit=10)
+    if avoid_items:
+        avoid = "\n[피해야 할 문구/컨셉]\n- " + "\n- ".join(avoid_items)
+
+    store_intro, intro_tokens, intro_cut = truncate_text(req.store_intro, SECTION_BUDGETS["store_intro"])
+    sections["store_intro"] = intro_tokens
+    if intro_cut:
+        truncated.append("store_intro")
+
+    style_hint = f"\n\n[이번 캡션의 방향]\n{hint}" if hint else ""
+
+    prompt = AD_PROMPT.render({
+        "num_variants": n,
+        "store_name": req.store_name,
+        "category": req.category,
+        "area_kw": area_kw,
+        "address": req.address,
+        "price": req.price,
+        "business_hours": bh,
+        "store_intro": store_intro,
+        "ps_kw": ps_kw,
+        "targets": targets,
+        "promos": promos,
+        "ig": ig,
+        "img_hint": img_hint,
+        "ref_links": ref_links,
+        "avoid": avoid,
+        "tone_rule": tone_rule,
+        "style_hint": style_hint,
+        "hashtag_limit": req.hashtag_limit,
+        "output_format": OUTPUT_FORMAT_JSON if getattr(req, "structured_output", False) else _OUTPUT_DELIMITED,
+    })
+    usage = {
+        "prompt_tokens": count_tokens(SYSTEM_PROMPT) + count_tokens(prompt),
+        "sections": sections,
+        "truncated": truncated,
+    }
+    return prompt, usage
+
+def _build_prompt(req, num_variants: Optional[int] = None, hint: Optional[str] = None) -> str:
+    return _render_prompt(req, num_variants, hint)[0]
+
+_TITLE_PREFIX = re.compile(r"^캡션\s*\d+\s*:\s*")
+_HASHTAG = re.compile(r"#([A-Za-z0-9가-힣_]+)")
 
 def _clean_caption_title(text: str) -> str:
-    return re.sub(r"^캡션\s*\d+\s*:\s*", "", text.strip())
+    return _TITLE_PREFIX.sub("", text.strip())
 
-def _parse_variants(text: str) -> List[Dict[str, Any]]:
-    blocks = [b.strip() for b in text.split(DELIM) if b.strip()]
+def _normalize_hashtags(tags: Iterable[str], hashtag_limit: Optional[int]) -> List[str]:
+    """'#' 제거, 허용 문자만, 중복 제거(순서 유지), hashtag_limit 개로 자름"""
+    seen, out = set(), []
+    for t in tags:
+        m = _HASHTAG.fullmatch("#" + str(t).strip().lstrip("#"))
+        if not m or m.group(1) in seen:
+            continue
+        seen.add(m.group(1)); out.append(m.group(1))
+        if hashtag_limit and len(out) >= hashtag_limit:
+            break
+    return out
+
+def _make_variant(body: str, hashtags: List[str]) -> Dict[str, Any]:
+    body = _clean_caption_title(body)  # ← 여기서 '캡션 1:' 제거
+    tag_line = " ".join("#" + t for t in hashtags)
+    content = body if not tag_line else (body.rstrip() + "\n\n" + tag_line)
+    return {"id": str(uuid.uuid4()), "content": content, "hashtags": hashtags}
+
+def _parse_block(b: str, hashtag_limit: Optional[int] = None) -> Dict[str, Any]:
+    """블록을 한 번만 훑어 '#' 이 있는 마지막 줄을 해시태그 줄로, 그 앞을 본문으로 본다."""
+    lines = b.strip().split("\n")
+    tag_idx = -1
+    for i, line in enumerate(lines):
+        if "#" in line:
+            tag_idx = i
+    if tag_idx < 0:
+        return _make_variant("\n".join(lines), [])
+    body = "\n".join(lines[:tag_idx]).strip()
+    return _make_variant(body, _normalize_hashtags(_HASHTAG.findall(lines[tag_idx]), hashtag_limit))
+
+def _parse_variants(text: str, hashtag_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    parser = _VariantStreamParser(hashtag_limit)
+    return parser.feed(text) + parser.close()
+
+def _parse_json_variants(text: str, hashtag_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """structured output 모드 응답: {"variants": [{"body", "hashtags": [...]}, ...]}"""
+    data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("variants") or [], list):
+        raise ValueError("structured output 최상위가 {\"variants\": [...]} 형태가 아닙니다")
+    items = data.get("variants") or []
+    if not all(isinstance(v, dict) for v in items):
+        raise ValueError("structured output variants 항목이 객체가 아닙니다")
+    return [
+        _make_variant(str(v.get("body") or ""), _normalize_hashtags(v.get("hashtags") or [], hashtag_limit))
+        for v in items
+        if str(v.get("body") or "").strip()
+    ]
+
+
+class _VariantStreamParser:
+    """
+    스트리밍 델타를 받아 구분자(VARIANT_END)가 도착할 때마다 완성된 캡션 블록을 돌려준다.
+    - 모델이 구분자 앞뒤 개행을 빠뜨리는 경우가 있어 개행 없는 마커 기준으로 자른다.
+    - 이미 훑은 위치(_scan)부터만 마커를 찾으므로 전체 입력에 대해 O(n).
+    """
+    MARKER = DELIM.strip()
+
+    def __init__(self, hashtag_limit: Optional[int] = None):
+        self.hashtag_limit = hashtag_limit
+        self._buf = ""
+        self._scan = 0
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        self._buf += delta
+        out: List[Dict[str, Any]] = []
+        while True:
+            idx = self._buf.find(self.MARKER, self._scan)
+            if idx < 0:
+                # 마커가 델타 경계에 걸칠 수 있으니 마커 길이-1 만큼만 남겨두고 다음에 이어서 찾는다
+                self._scan = max(0, len(self._buf) - len(self.MARKER) + 1)
+                break
+            block = self._buf[:idx]
+            self._buf = self._buf[idx + len(self.MARKER):]
+            self._scan = 0
+            if block.strip():
+                out.append(_parse_block(block, self.hashtag_limit))
+        return out
+
+    def close(self) -> List[Dict[str, Any]]:
+        """마지막 블록 뒤에 구분자가 없을 때 남은 텍스트를 캡션 하나로 마무리"""
+        rest, self._buf, self._scan = self._buf, "", 0
+        return [_parse_block(rest, self.hashtag_limit)] if rest.strip() else []
+
+
+def _parse_output(raw: str, req) -> List[Dict[str, Any]]:
+    """응답 포맷에 맞게 파싱하고 hashtag_limit 를 적용. 아무것도 못 건지면 원문을 캡션 하나로."""
+    variants: List[Dict[str, Any]] = []
+    if getattr(req, "structured_output", False):
+        try:
+            variants = _parse_json_variants(raw, req.hashtag_limit)
+        except ValueError:
+            print("[GA] structured output JSON 파싱 실패 → 구분자 파서로 재시도")
+    if not variants:
+        variants = _parse_variants(raw, req.hashtag_limit)
+    return variants or [_make_variant(raw.strip(), [])]
+
+def _response_format(req) -> Optional[Dict[str, Any]]:
+    return VARIANTS_RESPONSE_FORMAT if getattr(req, "structured_output", False) else None
+
+
+async def _generate_fanout(req, model: str = OPENAI_MODEL, temperature: float = OPENAI_TEMPERATURE) -> List[Dict[str, Any]]:
+    """
+    캡션 1개짜리 호출을 num_variants 개 동시에 보내고,
+    quorum 개가 완성되거나 deadline 이 지나면 남은 호출은 취소한다.
+    """
+    n = req.num_variants
+    quorum = min(getattr(req, "quorum", None) or n, n)
+    tasks = [
+        asyncio.create_task(
+            _call_openai(
+                _build_prompt(req, num_variants=1, hint=DIVERSITY_HINTS[i % len(DIVERSITY_HINTS)]),
+                model, temperature, _response_format(req),
+            )
+        )
+        for i in range(n)
+    ]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + GEN_FANOUT_DEADLINE_SEC
     variants: List[Dict[str, Any]] = []
-    for b in blocks:
-        parts = b.strip().split("\n")
-        hashtag_line = ""
-        for i in range(len(parts) - 1, -1, -1):
-            if "#" in parts[i]:
-                hashtag_line = parts[i].strip()
-                body = "\n".join(parts[:i]).strip()
+    errors: List[str] = []
+    pending = set(tasks)
+    try:
+        while pending and len(variants) < quorum:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
                 break
-        if not hashtag_line:
-            body = b.strip()
-        
-        body = _clean_caption_title(body)  # ← 여기서 '캡션 1:' 제거
-        content = body if not hashtag_line else (body.rstrip() + "\n\n" + hashtag_line)
-        variants.append({"id": str(uuid.uuid4()), "content": content})
-    return variants
-
-
-async def generate_ad_copy(req) -> dict:
-    prompt = _build_prompt(req)
-    raw = await to_thread.run_sync(_call_openai, prompt)
-    variants = _parse_variants(raw)
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception():
+                    errors.append(str(t.exception()))
+                    continue
+                variants.append(_parse_output(t.result(), req)[0])
+    finally:
+        for t in pending:
+            t.cancel()
+
     if not variants:
-        variants = [{"content": raw.strip()}]
-    return {"variants": variants[: req.num_variants]}
+        raise RuntimeError(f"OpenAI 호출 실패(fan-out): {errors[0] if errors else 'deadline 초과'}")
+    return variants[:n]
+
+
+def _route(req, prompt_tokens: int, plan: Optional[str]) -> Dict[str, Any]:
+    return model_router.route(
+        plan=plan,
+        num_variants=req.num_variants,
+        prompt_tokens=prompt_tokens,
+        default_model=OPENAI_MODEL,
+        default_temperature=OPENAI_TEMPERATURE,
+    )
 
+
+async def generate_ad_copy(req, plan: Optional[str] = None) -> dict:
+    prompt, usage = _render_prompt(req)
+    r = _route(req, usage["prompt_tokens"], plan)
+    use_cache = getattr(req, "use_cache", True)
+    key = cache_key(prompt, r["model"], r["temperature"])
+    if use_cache:
+        cached = await get_cached(key)
+        if cached:
+            return {"variants": cached[: req.num_variants], "cached": True, "usage": usage, "model": r}
+
+    if getattr(req, "fanout", False):
+        variants = await _generate_fanout(req, r["model"], r["temperature"])
+        # fan-out 은 캡션 수만큼 (1개짜리) 프롬프트를 보낸다
+        single_tokens = _render_prompt(req, num_variants=1)[1]["prompt_tokens"]
+        usage = {**usage, "prompt_tokens": single_tokens * req.num_variants, "calls": req.num_variants}
+    else:
+        raw = await _call_openai(prompt, r["model"], r["temperature"], _response_format(req))
+        variants = _parse_output(raw, req)[: req.num_variants]
+    # quorum 으로 일부만 받은 결과는 캐시하지 않는다
+    if use_cache and len(variants) >= req.num_variants:
+        await set_cached(key, variants)
+    return {"variants": variants, "cached": False, "usage": usage, "model": r}
+
+
+async def stream_ad_copy(req, plan: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """캡션이 하나 완성될 때마다 variant dict 를 내보낸다. (최대 num_variants 개)"""
+    if getattr(req, "structured_output", False):
+        # JSON 은 끝까지 받아야 파싱되므로 스트리밍은 항상 구분자 포맷을 쓴다
+        req = req.model_copy(update={"structured_output": False})
+    prompt, usage = _render_prompt(req)
+    r = _route(req, usage["prompt_tokens"], plan)
+    use_cache = getattr(req, "use_cache", True)
+    key = cache_key(prompt, r["model"], r["temperature"])
+    if use_cache:
+        cached = await get_cached(key)
+        if cached:
+            for v in cached[: req.num_variants]:
+                yield v
+            return
+
+    parser = _VariantStreamParser(req.hashtag_limit)
+    sent: List[Dict[str, Any]] = []
+    deltas = _stream_openai(prompt, r["model"], r["temperature"])
+    try:
+        async for delta in deltas:
+            for v in parser.feed(delta):
+                if len(sent) >= req.num_variants:
+                    break
+                sent.append(v)
+                yield v
+            if len(sent) >= req.num_variants:
+                break
+    finally:
+        await deltas.aclose()  # 조기 종료 시에도 스트림/슬롯을 바로 반납
+    for v in parser.close():
+        if len(sent) >= req.num_variants:
+            break
+        sent.append(v)
+        yield v
+    # 스트림이 중간에 끊겨 일부만 받은 결과는 캐시하지 않는다 (generate_ad_copy 와 같은 기준)
+    if use_cache and len(sent) >= req.num_variants:
+        await set_cached(key, sent)
@@ -0,0 +1,307 @@
+# backend/app/services/batch_service.py
+"""
+대량(비대화형) 광고 카피 생성 - OpenAI Batch API
+
+- 프랜차이즈 지점 수십 곳의 브리프를 JSONL 한 파일로 묶어 Batch API 에 제출하고
+  백그라운드 폴러가 완료를 확인하면 결과를 AdRepo 로 일괄 저장한다.
+- GEN_BATCH_BACKEND=local 이면 OpenAI 대신 로컬 파일 기반 대체 백엔드를 쓴다. (테스트/개발용)
+- 서버가 재시작되면 startup 에서 미완료 작업의 폴러를 다시 띄운다.
+"""
+import os, json, uuid, asyncio
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from app.db.database import AsyncSessionLocal
+from app.models.ad import AdBatchJob
+from app.repository.ad_repo import AdRepo
+from app.schemas.GA_schemas import GenerateAdRequest
+from app.services.GA_Service import (
+    client, OPENAI_MODEL, OPENAI_TEMPERATURE, DELIM,
+    _messages, _render_prompt, _parse_output, _response_format,
+)
+
+GEN_BATCH_BACKEND = os.getenv("GEN_BATCH_BACKEND", "openai")      # openai | local
+GEN_BATCH_POLL_SEC = float(os.getenv("GEN_BATCH_POLL_SEC", "30"))
+GEN_BATCH_POLL_MAX_SEC = float(os.getenv("GEN_BATCH_POLL_MAX_SEC", "600"))        # 오류 시 재시도 간격 상한
+GEN_BATCH_MAX_POLL_ERRORS = int(os.getenv("GEN_BATCH_MAX_POLL_ERRORS", "10"))     # 연속 오류 이만큼이면 failed
+GEN_BATCH_WINDOW = os.getenv("GEN_BATCH_WINDOW", "24h")
+GEN_BATCH_LOCAL_DIR = os.getenv("GEN_BATCH_LOCAL_DIR", "/tmp/pium-batch")
+
+# 진행 중인 폴러 (job_id -> task). 같은 작업을 두 번 폴링하지 않도록.
+_pollers: Dict[str, asyncio.Task] = {}
+
+
+class OpenAIBatchBackend:
+    name = "openai"
+
+    async def submit(self, lines: List[Dict[str, Any]]) -> str:
+        data = "\n".join(json.dumps(l, ensure_ascii=False) for l in lines).encode()
+        f = await client.files.create(file=("batch.jsonl", data), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=f.id,
+            endpoint="/v1/chat/completions",
+            completion_window=GEN_BATCH_WINDOW,
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str) -> Tuple[str, int, int, Optional[str], Optional[str]]:
+        """(status, completed, failed, output_file_id, error_file_id)"""
+        b = await client.batches.retrieve(batch_id)
+        counts = b.request_counts
+        return (
+            b.status,
+            counts.completed if counts else 0,
+            counts.failed if counts else 0,
+            b.output_file_id,
+            b.error_file_id,
+        )
+
+    async def fetch(self, output_ref: str) -> List[Dict[str, Any]]:
+        content = await client.files.content(output_ref)
+        return [json.loads(l) for l in content.text.splitlines() if l.strip()]
+
+
+def _echo_responder(body: Dict[str, Any]) -> str:
+    """로컬 백엔드 기본 응답: 프롬프트를 보지 않고 형식만 맞춘 더미 캡션"""
+    return f"(로컬 배치) 테스트 캡션\n\n#pium #test{DELIM}"
+
+
+class LocalFileBatchBackend:
+    """
+    Batch API 와 같은 입출력(JSONL)을 로컬 디렉터리에서 흉내낸다.
+    submit 시 입력 파일을 쓰고, 첫 poll 에서 responder 로 결과 파일을 만든 뒤 completed 를 돌려준다.
+    """
+    name = "local"
+
+    def __init__(self, root: str = GEN_BATCH_LOCAL_DIR, responder: Callable[[Dict[str, Any]], str] = _echo_responder):
+        self.root = root
+        self.responder = responder
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.root, f"{batch_id}.{kind}.jsonl")
+
+    async def submit(self, lines: List[Dict[str, Any]]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        with open(self._path(batch_id, "input"), "w", encoding="utf-8") as f:
+            for l in lines:
+                f.write(json.dumps(l, ensure_ascii=False) + "\n")
+        return batch_id
+
+    async def poll(self, batch_id: str) -> Tuple[str, int, int, Optional[str], Optional[str]]:
+        out_path = self._path(batch_id, "output")
+        if not os.path.exists(out_path):
+            with open(self._path(batch_id, "input"), encoding="utf-8") as fin, \
+                 open(out_path, "w", encoding="utf-8") as fout:
+                for raw in fin:
+                    line = json.loads(raw)
+                    result = {
+                        "custom_id": line["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"message": {"content": self.responder(line["body"])}}]},
+                        },
+                        "error": None,
+                    }
+                    fout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        with open(out_path, encoding="utf-8") as f:
+            n = sum(1 for _ in f)
+        return "completed", n, 0, out_path, None
+
+    async def fetch(self, output_ref: str) -> List[Dict[str, Any]]:
+        with open(output_ref, encoding="utf-8") as f:
+            return [json.loads(l) for l in f if l.strip()]
+
+
+_backends: Dict[str, Any] = {}
+
+def get_backend(name: str = GEN_BATCH_BACKEND):
+    if name not in _backends:
+        _backends[name] = LocalFileBatchBackend() if name == "local" else OpenAIBatchBackend()
+    return _backends[name]
+
+
+def _batch_line(job_id: str, index: int, req) -> Dict[str, Any]:
+    prompt, _ = _render_prompt(req)
+    body = {
+        "model": OPENAI_MODEL,
+        "messages": _messages(prompt),
+        "temperature": OPENAI_TEMPERATURE,
+    }
+    # structured_output 이면 프롬프트가 JSON 포맷을 요구하므로 동기 경로와 같은 json_schema 를 붙인다
+    response_format = _response_format(req)
+    if response_format:
+        body["response_format"] = response_format
+    return {
+        "custom_id": f"{job_id}:{index}",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body,
+    }
+
+
+async def submit_batch_job(db, *, user_id: int, briefs: List[Any]) -> AdBatchJob:
+    """브리프 목록을 배치로 제출하고 작업 행을 만든 뒤 폴러를 띄운다."""
+    backend = get_backend()
+    job_id = uuid.uuid4().hex
+    payloads = [b.model_dump(mode="json", exclude_none=True) for b in briefs]
+    lines = [_batch_line(job_id, i, b) for i, b in enumerate(briefs)]
+
+    provider_id = await backend.submit(lines)
+    job = AdBatchJob(
+        id=job_id,
+        user_id=user_id,
+        status="submitted",
+        backend=backend.name,
+        provider_batch_id=provider_id,
+        payloads=payloads,
+        total=len(briefs),
+        completed=0,
+        failed=0,
+    )
+    await AdRepo.create_batch_job(db, job=job)
+    await db.commit()
+    start_poller(job_id)
+    return job
+
+
+def start_poller(job_id: str) -> None:
+    task = _pollers.get(job_id)
+    if task and not task.done():
+        return
+    _pollers[job_id] = asyncio.create_task(_poll_job(job_id))
+
+
+async def _poll_once(job_id: str) -> bool:
+    """한 번 폴링. 작업이 끝났으면(완료/실패 기록까지) True"""
+    async with AsyncSessionLocal() as db:
+        job = await AdRepo.get_batch_job(db, job_id=job_id)
+        if not job or job.status in ("completed", "failed"):
+            return True
+        backend = get_backend(job.backend)
+        status, done, failed, output_ref, error_ref = await backend.poll(job.provider_batch_id)
+
+        if status == "completed" and output_ref:
+            await _store_results(db, job, await backend.fetch(output_ref))
+            return True
+        if status == "completed":
+            # 모든 요청이 실패하면 output_file_id 없이 error_file_id 만 온다
+            errors = await backend.fetch(error_ref) if error_ref else []
+            await AdRepo.update_batch_job(
+                db, job_id=job_id, status="failed", completed=0, failed=job.total,
+                request_ids=[None] * job.total, error=_first_error(errors),
+            )
+            await db.commit()
+            return True
+        if status in ("failed", "expired", "cancelled"):
+            await AdRepo.update_batch_job(db, job_id=job_id, status="failed", error=f"batch {status}")
+            await db.commit()
+            return True
+        await AdRepo.update_batch_job(
+            db, job_id=job_id, status="in_progress", completed=done, failed=failed,
+        )
+        await db.commit()
+        return False
+
+
+async def _poll_job(job_id: str) -> None:
+    """
+    끝날 때까지 폴링. poll/fetch/DB 오류는 일시적일 수 있으므로(배치는 제공자 쪽에서 계속 돈다)
+    간격을 늘려 가며(최대 GEN_BATCH_POLL_MAX_SEC) 재시도하고,
+    GEN_BATCH_MAX_POLL_ERRORS 번 연속 실패했을 때만 작업을 failed 로 둔다.
+    """
+    errors = 0
+    try:
+        while True:
+            try:
+                if await _poll_once(job_id):
+                    return
+                errors = 0
+                delay = GEN_BATCH_POLL_SEC
+            except Exception as e:
+                errors += 1
+                print(f"[batch] job {job_id} 폴링 실패 ({errors}/{GEN_BATCH_MAX_POLL_ERRORS}): {e}", flush=True)
+                if errors >= GEN_BATCH_MAX_POLL_ERRORS:
+                    await _mark_failed(job_id, str(e))
+                    return
+                delay = min(GEN_BATCH_POLL_SEC * 2 ** errors, GEN_BATCH_POLL_MAX_SEC)
+            await asyncio.sleep(delay)
+    finally:
+        _pollers.pop(job_id, None)
+
+
+async def _mark_failed(job_id: str, error: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await AdRepo.update_batch_job(db, job_id=job_id, status="failed", error=error[:1000])
+            await db.commit()
+    except Exception as e:
+        # 기록도 못 하면 미완료로 남으므로 재시작 때 resume_batch_jobs 가 다시 폴링한다
+        print(f"[batch] job {job_id} 실패 기록 실패: {e}", flush=True)
+
+
+def _first_error(errors: List[Dict[str, Any]]) -> str:
+    """에러 파일의 첫 오류 메시지 (작업 error 필드용)"""
+    for r in errors:
+        err = r.get("error") or ((r.get("response") or {}).get("body") or {}).get("error") or {}
+        if err:
+            return f"batch completed without output: {err.get('message') or err}"[:1000]
+    return "batch completed without output"
+
+
+async def _store_results(db, job: AdBatchJob, results: List[Dict[str, Any]]) -> None:
+    """배치 결과를 요청/variant 로 일괄 INSERT"""
+    by_index: Dict[int, List[Dict[str, Any]]] = {}
+    failed = 0
+    for r in results:
+        index = int(r["custom_id"].rsplit(":", 1)[1])
+        resp = r.get("response") or {}
+        if r.get("error") or resp.get("status_code") != 200:
+            failed += 1
+            continue
+        raw = (resp["body"]["choices"][0]["message"].get("content") or "").strip()
+        if not raw:
+            # json_schema 응답에서 거절(refusal)하면 content 가 null 로 온다
+            failed += 1
+            continue
+        req = GenerateAdRequest.model_validate(job.payloads[index])
+        by_index[index] = _parse_output(raw, req)[: req.num_variants]
+
+    indexes = sorted(by_index)
+    req_ids = await AdRepo.save_requests_bulk(
+        db, user_id=job.user_id, payloads=[job.payloads[i] for i in indexes],
+    )
+    await AdRepo.save_variants_bulk(
+        db, variants_by_request={rid: by_index[i] for rid, i in zip(req_ids, indexes)},
+    )
+    request_ids: List[Optional[int]] = [None] * job.total
+    for rid, i in zip(req_ids, indexes):
+        request_ids[i] = rid
+    await AdRepo.update_batch_job(
+        db, job_id=job.id, status="completed",
+        completed=len(indexes), failed=failed + (job.total - len(results)), request_ids=request_ids,
+    )
+    await db.commit()
+
+
+async def resume_batch_jobs() -> None:
+    """서버 재시작 후 미완료 작업의 폴러 재개"""
+    async with AsyncSessionLocal() as db:
+        for job in await AdRepo.list_unfinished_batch_jobs(db):
+            start_poller(job.id)
+
+
+def job_status(job: AdBatchJob) -> Dict[str, Any]:
+    done = (job.completed or 0) + (job.failed or 0)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "backend": job.backend,
+        "total": job.total,
+        "completed": job.completed,
+        "failed": job.failed,
+        "progress": round(done / job.total, 3) if job.total else 0.0,
+        "request_ids": job.request_ids,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
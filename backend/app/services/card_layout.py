@@ -0,0 +1,234 @@
+# backend/app/services/card_layout.py
+"""
+선언형 카드 템플릿 + 레이아웃 계산
+
+- 템플릿은 card_templates/ 의 JSON(또는 PyYAML 이 있으면 YAML) 파일 하나씩.
+    size        : [W, H]
+    background  : 배경 이미지가 없을 때 채울 색
+    slots       : [{"id", "box": [x, y, w, h]}]           사진이 cover 로 들어갈 자리
+    text_stack  : {"x", "top", "gap", "max_bottom", "items": [...]}
+                  items 는 위에서부터 쌓이고, 아래 끝이 max_bottom 을 넘으면 전체를 위로 올린다.
+                  item = {"field", "font", "max_w", "max_h", "size": [min, max], "max_lines",
+                          "fill", "stroke": [width, color]}
+- solve_layout 은 (템플릿, 문구)별로 줄나눔/폰트 크기/좌표를 한 번만 계산해 캐시한다.
+- text_masks 는 그 결과를 글자 마스크로 래스터화해 캐시한다. 렌더링은 색을 마스크로 붙이기만 하면 된다.
+- 폰트 객체와 글자 폭 측정값도 프로세스별로 메모이즈한다.
+- template_digest 는 로드된 템플릿 내용의 해시다. 합성 결과 캐시 키에 넣어, 템플릿 파일을 고치면
+  LAYOUT_VERSION 을 올리지 않아도 새로 렌더된다.
+"""
+import os, json, hashlib
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:  # YAML 템플릿은 선택
+    import yaml
+except ImportError:
+    yaml = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
+FONT_PATH_BOLD = os.path.join(UPLOADS_DIR, "BMDOHYEON_ttf.ttf")
+FONT_PATH_REG  = os.path.join(UPLOADS_DIR, "BMDOHYEON_ttf.ttf")
+# 템플릿의 "font" 이름 → 파일
+FONTS = {
+    "bold": FONT_PATH_BOLD,
+    "regular": FONT_PATH_REG,
+    "jua": os.path.join(UPLOADS_DIR, "BMJUA_ttf.ttf"),
+}
+TITLE_MIN_SIZE, TITLE_MAX_SIZE = 32, 128
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_templates")
+DEFAULT_TEMPLATE = os.getenv("COMPOSE_TEMPLATE", "v2_4x5")
+
+
+# ---- 폰트 / 글자 맞춤 ----
+def preload_fonts() -> None:
+    """제목 폰트 크기 범위를 미리 로드 (워커 시작 시 한 번)"""
+    for size in range(TITLE_MIN_SIZE, TITLE_MAX_SIZE + 1):
+        _load_font(FONT_PATH_BOLD, size)
+
+def _text_wh(font: ImageFont.FreeTypeFont, text: str):
+    x0, y0, x1, y1 = font.getbbox(text)
+    return (x1 - x0, y1 - y0)
+
+@lru_cache(maxsize=256)
+def _load_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    """TTF 파싱은 비싸므로 (경로, 크기)별로 한 번만 로드"""
+    return ImageFont.truetype(font_path, size=size)
+
+@lru_cache(maxsize=4096)
+def _measure(text: str, font_path: str, size: int):
+    """(text, size)별 bbox 폭/높이 메모이즈"""
+    return _text_wh(_load_font(font_path, size), text)
+
+def _fit_size(lines, max_w, max_h, font_path, max_size, min_size, line_gap=0) -> int:
+    """모든 줄이 max_w 안에, 줄 높이 합(+줄 간격)이 max_h 안에 들어가는 가장 큰 크기 (이분 탐색)"""
+    def fits(size):
+        dims = [_measure(l, font_path, size) for l in lines]
+        block_h = sum(h for _, h in dims) + line_gap * (len(lines) - 1)
+        return max(w for w, _ in dims) <= max_w and block_h <= max_h
+
+    lo, hi, best = min_size, max_size, min_size
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            best, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+def _fit_font(text, max_w, max_h, font_path, max_size, min_size=18):
+    return _load_font(font_path, _fit_size([text], max_w, max_h, font_path, max_size, min_size))
+
+def _split_two_lines(text: str, font_path: str, size: int):
+    """두 줄 폭이 가장 비슷해지는 위치에서 나눈다. 공백이 있으면 공백에서만 나눔"""
+    spaces = [i for i, ch in enumerate(text) if ch == " "]
+    if spaces:
+        cands = [(text[:i].rstrip(), text[i + 1:].lstrip()) for i in spaces]
+    else:
+        cands = [(text[:i], text[i:]) for i in range(1, len(text))]
+    cands = [c for c in cands if c[0] and c[1]]
+    if not cands:
+        return None
+    return min(cands, key=lambda c: max(_measure(c[0], font_path, size)[0], _measure(c[1], font_path, size)[0]))
+
+# 두 줄로 나눴을 때 이 비율 이상 커져야 줄바꿈을 택함
+WRAP_MIN_GAIN = 1.15
+
+def _fit_lines(text, max_w, max_h, font_path, max_size, min_size=18, line_gap=0):
+    """
+    한 줄 또는 두 줄로 배치했을 때 더 크게 쓸 수 있는 쪽을 골라 (lines, font) 반환.
+    긴 가게 이름이 한 줄에 욱여넣어져 작아지는 것을 막는다.
+    """
+    size = _fit_size([text], max_w, max_h, font_path, max_size, min_size)
+    lines = [text]
+    if size < max_size:
+        split = _split_two_lines(text, font_path, max_size)
+        if split:
+            size2 = _fit_size(list(split), max_w, max_h, font_path, max_size, min_size, line_gap)
+            if size2 >= size * WRAP_MIN_GAIN:
+                size, lines = size2, list(split)
+    return lines, _load_font(font_path, size)
+
+
+# ---- 템플릿 ----
+def _load_templates() -> Dict[str, Dict[str, Any]]:
+    templates = {}
+    for fn in sorted(os.listdir(TEMPLATES_DIR)):
+        path = os.path.join(TEMPLATES_DIR, fn)
+        with open(path, encoding="utf-8") as f:
+            if fn.endswith(".json"):
+                t = json.load(f)
+            elif fn.endswith((".yaml", ".yml")) and yaml is not None:
+                t = yaml.safe_load(f)
+            else:
+                continue
+        templates[t["name"]] = t
+    return templates
+
+TEMPLATES = _load_templates()
+# name -> 템플릿 내용 해시 (키 순서/공백과 무관하게 파싱된 값 기준)
+TEMPLATE_DIGESTS = {
+    name: hashlib.sha256(json.dumps(t, ensure_ascii=False, sort_keys=True).encode()).hexdigest()[:16]
+    for name, t in TEMPLATES.items()
+}
+
+
+def get_template(name: Optional[str] = None) -> Dict[str, Any]:
+    name = name or DEFAULT_TEMPLATE
+    if name not in TEMPLATES:
+        raise ValueError(f"알 수 없는 템플릿: {name}")
+    return TEMPLATES[name]
+
+def template_digest(name: Optional[str] = None) -> str:
+    get_template(name)
+    return TEMPLATE_DIGESTS[name or DEFAULT_TEMPLATE]
+
+def template_size(name: Optional[str] = None) -> Tuple[int, int]:
+    w, h = get_template(name)["size"]
+    return w, h
+
+
+@lru_cache(maxsize=512)
+def solve_layout(name: str, texts: Tuple[Tuple[str, str], ...]) -> Dict[str, Any]:
+    """
+    (템플릿, 문구) → 그릴 줄 목록과 사진 슬롯 좌표.
+    texts 는 캐시 키로 쓰기 위해 (field, text) 튜플로 받는다.
+    반환: {"size", "background", "slots": [{"id", "box"}], "lines": [{"text", "xy", "font", "size", "fill", "stroke"}]}
+    """
+    t = get_template(name)
+    values = dict(texts)
+    stack = t.get("text_stack") or {"items": []}
+    gap = stack.get("gap", 0)
+
+    blocks = []  # (item, lines, font)
+    for item in stack["items"]:
+        text = values.get(item["field"], "")
+        if not text:
+            continue
+        path = FONTS[item.get("font", "bold")]
+        min_size, max_size = item.get("size", [18, 128])
+        if item.get("max_lines", 1) > 1:
+            lines, font = _fit_lines(text, item["max_w"], item["max_h"], path, max_size, min_size, gap)
+        else:
+            lines, font = [text], _fit_font(text, item["max_w"], item["max_h"], path, max_size, min_size)
+        blocks.append((item, lines, font))
+
+    heights = [sum(_text_wh(font, l)[1] for l in lines) + gap * (len(lines) - 1) for _, lines, font in blocks]
+    bottom = stack.get("top", 0) + sum(heights) + gap * max(0, len(blocks) - 1)
+    y = stack.get("top", 0)
+    if stack.get("max_bottom") is not None and bottom > stack["max_bottom"]:
+        y -= bottom - stack["max_bottom"]
+
+    out_lines = []
+    for item, lines, font in blocks:
+        for line in lines:
+            stroke = item.get("stroke") or [0, None]
+            out_lines.append({
+                "text": line,
+                "xy": (stack.get("x", 0), y),
+                "font": item.get("font", "bold"),
+                "size": font.size,
+                "fill": item.get("fill", "#ffffff"),
+                "stroke": (stroke[0], stroke[1]),
+            })
+            y += _text_wh(font, line)[1] + gap
+
+    return {
+        "size": tuple(t["size"]),
+        "background": t.get("background", "#000000"),
+        "slots": [{"id": s["id"], "box": tuple(s["box"])} for s in t.get("slots", [])],
+        "lines": out_lines,
+    }
+
+
+@lru_cache(maxsize=64)
+def text_masks(name: str, texts: Tuple[Tuple[str, str], ...]) -> List[Tuple[str, Image.Image, Tuple[int, int]]]:
+    """
+    solve_layout 결과를 (색, L 마스크, 위치) 목록으로 래스터화.
+    외곽선 → 본문 순서로, ImageDraw.text 가 내부에서 하는 것과 같은 방식(paste(color, mask))으로 칠하면 된다.
+    """
+    layout = solve_layout(name, texts)
+    size = layout["size"]
+    ops = []
+    for ln in layout["lines"]:
+        font = _load_font(FONTS[ln["font"]], ln["size"])
+        passes = []
+        if ln["stroke"][0]:
+            passes.append((ln["stroke"][1], ln["stroke"][0]))
+        passes.append((ln["fill"], 0))
+        for color, width in passes:
+            mask = Image.new("L", size, 0)
+            ImageDraw.Draw(mask).text(ln["xy"], ln["text"], font=font, fill=255,
+                                      stroke_width=width, stroke_fill=255)
+            box = mask.getbbox()
+            if box:
+                ops.append((color, mask.crop(box), box[:2]))
+    return ops
+
+
+def paint_text(canvas: Image.Image, name: str, texts: Tuple[Tuple[str, str], ...]) -> None:
+    for color, mask, xy in text_masks(name, texts):
+        canvas.paste(color, (*xy, xy[0] + mask.width, xy[1] + mask.height), mask)
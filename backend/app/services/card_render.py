@@ -0,0 +1,176 @@
+# backend/app/services/card_render.py
+"""
+카드 이미지 렌더링 (Pillow)
+
+- 네트워크/S3 없이 바이트 → 바이트로만 동작하는 순수 함수 모음.
+  compose_engine 의 워커 프로세스에서 그대로 import 해서 쓴다.
+- 배치/글자 크기는 card_layout 템플릿이 정하고, 여기서는 디코드/붙이기/인코드만 한다.
+"""
+import os, io, math, time
+from typing import Dict, Any, Optional, Tuple
+from PIL import Image, ImageOps, ExifTags, features
+
+from app.services import card_layout
+
+CARD_W, CARD_H = card_layout.template_size()
+# 렌더 결과가 달라지는 변경(레이아웃/폰트/리사이즈)을 하면 올린다. 합성 결과 캐시 키에 들어감
+LAYOUT_VERSION = "v2.3"
+
+# reduce() 뒤에도 최종 크기의 이 배수 이상은 남겨 LANCZOS 품질을 유지 (Pillow reducing_gap 과 같은 의미)
+REDUCING_GAP = 2.0
+
+# 출력 인코더 프로필. avif 는 Pillow 가 AVIF 를 지원할 때만 쓰고, 아니면 fallback 으로.
+ENCODER_PROFILES: Dict[str, Dict[str, Any]] = {
+    "preview":  {"format": "WEBP", "params": {"quality": 75, "method": 0}},
+    "balanced": {"format": "WEBP", "params": {"quality": 85, "method": 4}},
+    "archival": {"format": "WEBP", "params": {"quality": 92, "method": 6}},
+    "jpeg":     {"format": "JPEG", "params": {"quality": 90, "progressive": True, "optimize": True}},
+    "avif":     {"format": "AVIF", "params": {"quality": 65, "speed": 6}, "fallback": "balanced"},
+}
+# format -> (content_type, 확장자)
+_FORMAT_META = {
+    "WEBP": ("image/webp", ".webp"),
+    "JPEG": ("image/jpeg", ".jpg"),
+    "AVIF": ("image/avif", ".avif"),
+}
+DEFAULT_ENCODER_PROFILE = os.getenv("COMPOSE_ENCODER_PROFILE", "archival")
+
+# EXIF Orientation 이 이 값이면 exif_transpose 후 가로/세로가 바뀐다
+_SWAPPED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def open_for(data: bytes, target_w: int, target_h: int) -> Image.Image:
+    """
+    target 을 cover 로 채울 만큼만 디코드한다.
+    JPEG 는 draft() 로 DCT 단계에서 1/2~1/8 로 줄여 읽으므로 12MP 사진도 전체 해상도로 풀지 않는다.
+    (draft 는 요청 크기 이상을 보장하므로 이후 리사이즈 품질은 그대로)
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        tw, th = target_w, target_h
+        if img.getexif().get(ExifTags.Base.Orientation) in _SWAPPED_ORIENTATIONS:
+            tw, th = th, tw  # 저장된 방향 기준으로 맞춘다
+        iw, ih = img.size
+        scale = max(tw / iw, th / ih)
+        if scale < 1:
+            img.draft(img.mode, (math.ceil(iw * scale), math.ceil(ih * scale)))
+    return ImageOps.exif_transpose(img)
+
+def _resize_cover(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
+    iw, ih = img.size
+    scale = max(target_w / iw, target_h / ih)
+    # 정수 배 박스 축소(reduce)로 먼저 줄이고 남은 비율만 LANCZOS 로
+    factor = int(1 / (scale * REDUCING_GAP)) if scale < 1 else 1
+    if factor > 1:
+        img = img.reduce(factor)
+        iw, ih = img.size
+        scale = max(target_w / iw, target_h / ih)
+    rs = img.resize((math.ceil(iw * scale), math.ceil(ih * scale)), Image.Resampling.LANCZOS)
+    rw, rh = rs.size
+    left = (rw - target_w) // 2
+    top  = (rh - target_h) // 2
+    return rs.crop((left, top, left + target_w, top + target_h))
+
+def resolve_profile(name: Optional[str]) -> str:
+    """프로필 이름 확인. 이 환경에서 못 쓰는 포맷이면 fallback 프로필 이름을 돌려준다."""
+    name = name or DEFAULT_ENCODER_PROFILE
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"알 수 없는 인코더 프로필: {name}")
+    profile = ENCODER_PROFILES[name]
+    if profile["format"] == "AVIF" and not features.check("avif"):
+        return resolve_profile(profile["fallback"])
+    return name
+
+def output_meta(profile: str) -> Tuple[str, str]:
+    """resolve_profile 을 거친 프로필의 (content_type, 확장자)"""
+    return _FORMAT_META[ENCODER_PROFILES[profile]["format"]]
+
+def encode(img: Image.Image, profile: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """프로필대로 인코드하고 (bytes, {profile, format, content_type, ext, encode_ms, bytes}) 반환"""
+    name = resolve_profile(profile)
+    spec = ENCODER_PROFILES[name]
+    t = time.perf_counter()
+    out = io.BytesIO()
+    img.save(out, spec["format"], **spec["params"])
+    data = out.getvalue()
+    content_type, ext = output_meta(name)
+    return data, {
+        "profile": name,
+        "format": spec["format"],
+        "content_type": content_type,
+        "ext": ext,
+        "encode_ms": round((time.perf_counter() - t) * 1000, 1),
+        "bytes": len(data),
+    }
+
+def prepare_background(bg_bytes: bytes, size: Tuple[int, int] = (CARD_W, CARD_H)) -> Image.Image:
+    """배경을 디코드/회전/리사이즈해 size 크기 RGB 캔버스로. (호출부에서 캐시)"""
+    w, h = size
+    canvas = Image.new("RGB", (w, h), "#000000")
+    bg = open_for(bg_bytes, w, h)
+    if bg.mode != "RGB":
+        bg = bg.convert("RGB")  # P/1/I;16 PNG 는 reduce() 를 못 쓴다
+    bg = _resize_cover(bg, w, h)
+    canvas.paste(bg, (0, 0))
+    return canvas
+
+
+def render_template(
+    template: str,
+    bg_canvas: Optional[Image.Image],
+    texts: Dict[str, str],
+    images: Dict[str, bytes],
+    encoder_profile: Optional[str] = None,
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    템플릿 렌더링. 좌표/글자 마스크는 card_layout 캐시에서 오므로 여기서는 붙이기만 한다.
+    bg_canvas 는 템플릿 크기로 준비된 배경 (없으면 템플릿 background 색)
+    """
+    key = tuple(sorted(texts.items()))
+    layout = card_layout.solve_layout(template, key)
+    canvas = bg_canvas.copy() if bg_canvas is not None else Image.new("RGB", layout["size"], layout["background"])
+
+    for slot in layout["slots"]:
+        data = images.get(slot["id"])
+        if data is None:
+            continue
+        x, y, w, h = slot["box"]
+        img = open_for(data, w, h)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        canvas.paste(_resize_cover(img, w, h), (x, y))
+
+    card_layout.paint_text(canvas, template, key)
+    return encode(canvas, encoder_profile)
+
+
+# ---- v2 카드 (시안 스타일) ----
+def render_card_v2(
+    bg_canvas: Image.Image,
+    thumb_bytes: bytes,
+    store_name: str,
+    district: str,
+    encoder_profile: Optional[str] = None,
+    template: Optional[str] = None,
+) -> Tuple[bytes, Dict[str, Any]]:
+    return render_template(
+        template or card_layout.DEFAULT_TEMPLATE,
+        bg_canvas,
+        {"district": district, "store_name": store_name},
+        {"photo": thumb_bytes},
+        encoder_profile,
+    )
+
+
+# ---- 사진 슬라이드 (캐러셀 2장째부터) ----
+def render_photo(
+    photo_bytes: bytes,
+    encoder_profile: Optional[str] = None,
+    size: Tuple[int, int] = (CARD_W, CARD_H),
+) -> Tuple[bytes, Dict[str, Any]]:
+    """문구 없이 size(기본 1080x1350, 4:5) 로 cover 크롭만 해서 캐러셀 비율을 맞춘다."""
+    w, h = size
+    img = open_for(photo_bytes, w, h)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return encode(_resize_cover(img, w, h), encoder_profile)
@@ -0,0 +1,166 @@
+# backend/app/services/compose_engine.py
+"""
+카드 합성 엔진 (프로세스 풀)
+
+- Pillow 디코드/LANCZOS 리사이즈/WEBP 인코드는 대부분 GIL 을 잡고 있어, 스레드로 돌리면
+  한 uvicorn 워커 안의 합성이 사실상 직렬화된다. 그래서 COMPOSE_WORKERS 개의 프로세스로 돌린다.
+- 워커에는 바이트만 주고받는다. (배경 버전, 썸네일 바이트 → 인코드된 바이트 + 메타)
+  워커는 시작 시 폰트를 미리 로드하고, 리사이즈된 배경 캔버스를 버전별로 캐시한다.
+  배경 원본 바이트는 새 버전의 첫 합성에만 싣고, 그 뒤로는 버전만 보낸다.
+  캐시가 없는 워커(새로 뜬 워커 등)는 _BackgroundMiss 를 돌려주고, 그때만 바이트를 실어 다시 보낸다.
+- 대기 중인 합성이 COMPOSE_MAX_PENDING 개를 넘으면 COMPOSE_QUEUE_TIMEOUT_SEC 까지 기다리고,
+  그래도 자리가 안 나면 ComposeBusy 를 올린다. (라우터에서 503)
+- 인코더 프로필별 인코드 시간/출력 크기를 누적해 encoder_stats() 로 보여준다.
+- COMPOSE_WORKERS=0 이면 프로세스 풀 없이 스레드에서 같은 코드를 돌린다. (개발/디버깅용)
+"""
+import os, asyncio, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+from app.services import card_render, card_layout
+
+COMPOSE_WORKERS = int(os.getenv("COMPOSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+COMPOSE_MAX_PENDING = int(os.getenv("COMPOSE_MAX_PENDING", str(max(1, COMPOSE_WORKERS) * 4)))
+COMPOSE_QUEUE_TIMEOUT_SEC = float(os.getenv("COMPOSE_QUEUE_TIMEOUT_SEC", "10"))
+
+
+class ComposeBusy(Exception):
+    """합성 대기열이 가득 차 COMPOSE_QUEUE_TIMEOUT_SEC 안에 자리를 얻지 못함"""
+
+
+class _BackgroundMiss(Exception):
+    """워커에 해당 버전 배경 캐시가 없는데 바이트 없이 요청됨 → 바이트를 실어 다시 보냄"""
+
+
+# ---- 워커 프로세스 쪽 ----
+# (bg_version, 템플릿 크기) -> 리사이즈 끝난 배경 캔버스 (최신 버전만 유지)
+_worker_bg: Dict[Tuple[str, Tuple[int, int]], Image.Image] = {}
+
+def _init_worker() -> None:
+    card_layout.preload_fonts()
+
+def _worker_background(bg_version: str, bg_bytes: Optional[bytes], size: Tuple[int, int]) -> Image.Image:
+    canvas = _worker_bg.get((bg_version, size))
+    if canvas is None:
+        if bg_bytes is None:
+            raise _BackgroundMiss(bg_version)
+        for k in [k for k in _worker_bg if k[0] != bg_version]:
+            del _worker_bg[k]
+        canvas = _worker_bg[(bg_version, size)] = card_render.prepare_background(bg_bytes, size)
+    return canvas
+
+def _render(bg_version: str, bg_bytes: Optional[bytes], thumb_bytes: bytes, store_name: str, district: str,
+            encoder_profile: Optional[str], template: str) -> Tuple[bytes, Dict[str, Any]]:
+    return card_render.render_card_v2(
+        _worker_background(bg_version, bg_bytes, card_layout.template_size(template)),
+        thumb_bytes, store_name, district,
+        encoder_profile=encoder_profile, template=template,
+    )
+
+def _render_photo(photo_bytes: bytes, encoder_profile: Optional[str], template: str) -> Tuple[bytes, Dict[str, Any]]:
+    return card_render.render_photo(photo_bytes, encoder_profile, card_layout.template_size(template))
+
+
+# ---- 인코더 통계 (부모 프로세스) ----
+# profile -> {count, encode_ms_sum, bytes_sum}
+_encoder_stats: Dict[str, Dict[str, float]] = {}
+
+def _record_encode(meta: Dict[str, Any]) -> None:
+    st = _encoder_stats.setdefault(meta["profile"], {"count": 0, "encode_ms_sum": 0.0, "bytes_sum": 0})
+    st["count"] += 1
+    st["encode_ms_sum"] += meta["encode_ms"]
+    st["bytes_sum"] += meta["bytes"]
+
+def encoder_stats() -> Dict[str, Any]:
+    return {
+        "default_profile": card_render.DEFAULT_ENCODER_PROFILE,
+        "profiles": {
+            name: {
+                "count": st["count"],
+                "avg_encode_ms": round(st["encode_ms_sum"] / st["count"], 1),
+                "avg_bytes": int(st["bytes_sum"] / st["count"]),
+            }
+            for name, st in _encoder_stats.items()
+        },
+    }
+
+
+# ---- 호출하는 쪽 (이벤트 루프) ----
+class ComposeEngine:
+    def __init__(self, workers: int = COMPOSE_WORKERS, max_pending: int = COMPOSE_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._bg_version: Optional[str] = None   # 바이트를 한 번이라도 실어 보낸 최신 배경 버전
+
+    def start(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self.workers > 0 and self._pool is None:
+            # 부모는 이벤트 루프/스레드를 갖고 있으므로 fork 대신 spawn
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._bg_version = None
+
+    async def render(self, *, bg_version: str, bg_bytes: bytes, thumb_bytes: bytes,
+                     store_name: str, district: str, encoder_profile: Optional[str] = None,
+                     template: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """v2 카드 (배경 + 제목 + 사진 슬롯). 배치는 template 이 정한다."""
+        args = (thumb_bytes, store_name, district, encoder_profile, template or card_layout.DEFAULT_TEMPLATE)
+        if bg_version == self._bg_version:
+            try:
+                return await self._submit(_render, bg_version, None, *args)
+            except _BackgroundMiss:
+                pass
+        out = await self._submit(_render, bg_version, bg_bytes, *args)
+        self._bg_version = bg_version
+        return out
+
+    async def render_photo(self, *, photo_bytes: bytes, encoder_profile: Optional[str] = None,
+                           template: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """사진 슬라이드 (템플릿 비율로 크롭만)"""
+        return await self._submit(
+            _render_photo, photo_bytes, encoder_profile, template or card_layout.DEFAULT_TEMPLATE,
+        )
+
+    async def _submit(self, fn, *args) -> Tuple[bytes, Dict[str, Any]]:
+        self.start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), COMPOSE_QUEUE_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            raise ComposeBusy(f"합성 대기열이 가득 찼습니다 ({self.max_pending}개)")
+        try:
+            if self._pool is None:
+                data, meta = await asyncio.to_thread(fn, *args)
+            else:
+                try:
+                    data, meta = await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+                except BrokenProcessPool:
+                    # 워커가 죽으면(OOM 등) 풀을 버리고 다음 요청에서 새로 만든다
+                    self.shutdown()
+                    raise RuntimeError("합성 워커 프로세스가 비정상 종료되었습니다")
+        finally:
+            self._slots.release()
+        _record_encode(meta)
+        return data, meta
+
+
+engine = ComposeEngine()
+
+def start_compose_engine() -> None:
+    engine.start()
+
+def stop_compose_engine() -> None:
+    engine.shutdown()
@@ -0,0 +1,97 @@
+# backend/app/services/generation_cache.py
+"""
+광고 카피 생성 결과 캐시
+
+- 키: 공백을 정규화한 프롬프트 + 모델 + temperature 의 sha256 (내용 주소 기반)
+- 1차: 프로세스 내 LRU + TTL
+- 2차(선택): REDIS_URL 이 있고 redis 패키지가 설치돼 있으면 공유 캐시로 사용
+- variant id 는 DB PK 이므로 캐시에는 id 를 뺀 나머지만 저장하고, 꺼낼 때마다 새 id 를 발급한다.
+"""
+import os, re, json, time, hashlib, uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+GEN_CACHE_TTL_SEC = int(os.getenv("GEN_CACHE_TTL_SEC", "600"))
+GEN_CACHE_MAX_ITEMS = int(os.getenv("GEN_CACHE_MAX_ITEMS", "512"))
+GEN_CACHE_REDIS_PREFIX = os.getenv("GEN_CACHE_REDIS_PREFIX", "pium:gen:")
+REDIS_URL = os.getenv("REDIS_URL")
+
+try:  # 공유 캐시는 선택 의존성
+    import redis.asyncio as _redis
+except ImportError:
+    _redis = None
+
+_WS = re.compile(r"\s+")
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    """공백 차이만 있는 브리프는 같은 키가 되도록 정규화 후 해시.
+    대소문자는 그대로 둔다 (가게 이름/URL/해시태그 표기가 다르면 다른 캡션이어야 함)"""
+    norm = _WS.sub(" ", prompt).strip()
+    raw = json.dumps({"p": norm, "m": model, "t": temperature}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class _LocalLRU:
+    def __init__(self, max_items: int, ttl: int):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        item = self._data.get(key)
+        if not item:
+            return None
+        expires_at, contents = item
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return contents
+
+    def set(self, key: str, contents: List[Dict[str, Any]]) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, contents)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local = _LocalLRU(GEN_CACHE_MAX_ITEMS, GEN_CACHE_TTL_SEC)
+_shared = _redis.from_url(REDIS_URL) if (_redis and REDIS_URL) else None
+
+
+def _with_new_ids(contents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"id": str(uuid.uuid4()), **c} for c in contents]
+
+
+async def get_cached(key: str) -> Optional[List[Dict[str, Any]]]:
+    contents = _local.get(key)
+    if contents is None and _shared is not None:
+        try:
+            raw = await _shared.get(GEN_CACHE_REDIS_PREFIX + key)
+        except Exception as e:  # 공유 캐시 장애는 캐시 미스로 취급
+            print(f"[gen-cache] redis get 실패: {e}")
+            raw = None
+        if raw:
+            contents = json.loads(raw)
+            _local.set(key, contents)
+    return _with_new_ids(contents) if contents else None
+
+
+async def set_cached(key: str, variants: List[Dict[str, Any]]) -> None:
+    contents = [{k: val for k, val in v.items() if k != "id"} for v in variants if v.get("content")]
+    if not contents:
+        return
+    _local.set(key, contents)
+    if _shared is not None:
+        try:
+            await _shared.set(
+                GEN_CACHE_REDIS_PREFIX + key,
+                json.dumps(contents, ensure_ascii=False),
+                ex=GEN_CACHE_TTL_SEC,
+            )
+        except Exception as e:
+            print(f"[gen-cache] redis set 실패: {e}")
@@ -0,0 +1,145 @@
+# backend/app/services/image_derivatives.py
+"""
+업로드 이미지 파생본 생성 (Pillow)
+
+- card_render 처럼 바이트 → 바이트 순수 함수만 둔다. upload_processing 의 워커 프로세스에서 import 해서 쓴다.
+- 정규화: EXIF Orientation 대로 회전, ICC 프로필이 있으면 sRGB 로 변환, 알파는 흰 배경에 합성.
+  파생본은 메타데이터 없이 저장하므로 GPS 등 EXIF 가 따라가지 않는다. (원본은 그대로 둔다)
+- 파생본: feed(짧은 변 1080, 인스타그램/카드 합성용), thumb(짧은 변 320, 목록/미리보기용) JPEG
+  + blurhash 문자열 + LQIP(아주 작은 JPEG data URI). 로딩 중 자리표시자는 둘 중 편한 쪽을 쓰면 된다.
+"""
+import io, math, base64
+from typing import Dict, Any, List, Tuple
+
+from PIL import Image, ImageCms, features
+
+from app.services.card_render import open_for, REDUCING_GAP
+
+# name -> 짧은 변 목표, 긴 변 상한(파노라마가 너무 커지지 않게), JPEG 품질
+DERIVATIVES: Dict[str, Dict[str, int]] = {
+    "feed":  {"short": 1080, "long": 2160, "quality": 85},
+    "thumb": {"short": 320,  "long": 640,  "quality": 80},
+}
+LQIP_LONG_EDGE = 16
+LQIP_QUALITY = 40
+BLURHASH_COMPONENTS = (4, 3)   # (x, y)
+BLURHASH_SAMPLE = 32           # blurhash 는 이 크기로 줄인 이미지에서 계산
+
+_SRGB = ImageCms.createProfile("sRGB") if features.check("littlecms2") else None
+_B83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def normalize(data: bytes, short_edge: int) -> Image.Image:
+    """방향/색공간/모드를 맞춘 RGB 이미지. JPEG 는 짧은 변 short_edge 이상으로만 디코드"""
+    img = open_for(data, short_edge, short_edge)
+    icc = img.info.get("icc_profile")
+    if icc and _SRGB is not None:
+        try:
+            img = ImageCms.profileToProfile(img, ImageCms.ImageCmsProfile(io.BytesIO(icc)), _SRGB,
+                                            outputMode="RGBA" if "A" in img.getbands() else "RGB")
+        except (ImageCms.PyCMSError, OSError, ValueError):
+            pass  # 깨진 프로필은 무시하고 그대로
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, "#ffffff")
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+def fit(img: Image.Image, short_edge: int, long_edge: int) -> Image.Image:
+    """짧은 변 short_edge, 긴 변 long_edge 를 넘지 않게 비율 유지 축소 (확대는 안 함)"""
+    w, h = img.size
+    scale = min(1.0, short_edge / min(w, h), long_edge / max(w, h))
+    if scale >= 1.0:
+        return img
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+def _jpeg(img: Image.Image, quality: int) -> bytes:
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality, progressive=True, optimize=True)
+    return out.getvalue()
+
+def lqip(img: Image.Image) -> str:
+    """긴 변 LQIP_LONG_EDGE 픽셀 JPEG 를 data URI 로 (보통 1KB 미만)"""
+    small = img.copy()
+    small.thumbnail((LQIP_LONG_EDGE, LQIP_LONG_EDGE), Image.Resampling.BILINEAR)
+    return "data:image/jpeg;base64," + base64.b64encode(_jpeg(small, LQIP_QUALITY)).decode()
+
+
+# ---- blurhash (https://github.com/woltapp/blurhash 알고리즘) ----
+def _b83(value: int, length: int) -> str:
+    return "".join(_B83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+def _to_linear(v: int) -> float:
+    v = v / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+def _to_srgb(v: float) -> int:
+    v = max(0.0, min(1.0, v))
+    return int(v * 12.92 * 255 + 0.5) if v <= 0.0031308 else int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def _sign_pow(v: float, e: float) -> float:
+    return math.copysign(abs(v) ** e, v)
+
+def blurhash(img: Image.Image, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    cx, cy = components
+    small = img.copy()
+    small.thumbnail((BLURHASH_SAMPLE, BLURHASH_SAMPLE), Image.Resampling.BILINEAR)
+    w, h = small.size
+    table = [_to_linear(v) for v in range(256)]
+    pixels = [(table[r], table[g], table[b]) for r, g, b in small.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / w) for x in range(w)] for i in range(cx)]
+    cos_y = [[math.cos(math.pi * j * y / h) for y in range(h)] for j in range(cy)]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(cy):
+        for i in range(cx):
+            r = g = b = 0.0
+            for y in range(h):
+                row, fy = y * w, cos_y[j][y]
+                for x in range(w):
+                    basis = fy * cos_x[i][x]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = (1 if i == j == 0 else 2) / (w * h)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    out = _b83((cx - 1) + (cy - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, int(max(abs(c) for f in ac for c in f) * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        out += _b83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        out += _b83(0, 1)
+    out += _b83((_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]), 4)
+    for f in ac:
+        q = [max(0, min(18, int(_sign_pow(c / max_value, 0.5) * 9 + 9.5))) for c in f]
+        out += _b83(q[0] * 19 * 19 + q[1] * 19 + q[2], 2)
+    return out
+
+
+def make_derivatives(data: bytes) -> Dict[str, Any]:
+    """
+    원본 바이트 → 파생본.
+    반환: {"variants": {name: {"bytes", "width", "height", "content_type"}}, "blurhash", "lqip"}
+    """
+    largest = max(DERIVATIVES.values(), key=lambda d: d["short"])
+    img = normalize(data, largest["short"])
+
+    variants: Dict[str, Dict[str, Any]] = {}
+    # 큰 것부터 만들고, 작은 파생본은 바로 앞 결과에서 줄인다
+    for name, spec in sorted(DERIVATIVES.items(), key=lambda kv: -kv[1]["short"]):
+        img = fit(img, spec["short"], spec["long"])
+        variants[name] = {
+            "bytes": _jpeg(img, spec["quality"]),
+            "width": img.width,
+            "height": img.height,
+            "content_type": "image/jpeg",
+        }
+    return {"variants": variants, "blurhash": blurhash(img), "lqip": lqip(img)}
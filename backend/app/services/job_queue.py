@@ -0,0 +1,285 @@
+# backend/app/services/job_queue.py
+"""
+광고 카피 생성 작업 큐 (job 모드)
+
+- POST /api/generate?mode=job 은 작업을 큐에 넣고 job_id 만 바로 돌려준다.
+- 워커 풀(GEN_JOB_WORKERS 개의 asyncio 태스크)이 generate_ad_copy 를 실행하고 AdRepo 로 저장한다.
+- 클라이언트는 GET /api/generate/jobs/{job_id} 로 폴링하거나, callback_url 로 완료 통지를 받는다.
+  (GEN_JOB_CALLBACK_SECRET 이 있으면 본문 HMAC-SHA256 을 X-Pium-Signature 헤더로 보냄)
+  callback_url 은 https 만 받고, 호스트가 사설/루프백/링크로컬 등 공인 주소가 아닌 IP 로 풀리면 거부한다.
+  GEN_JOB_CALLBACK_ALLOWED_HOSTS(쉼표 구분, ".example.com" 은 하위 도메인 포함)가 있으면 그 호스트만 허용.
+  DNS 가 바뀔 수 있으니 접수 때와 통지 직전에 모두 검사하고, 리다이렉트는 따라가지 않는다.
+
+백엔드
+- memory : 프로세스 내 asyncio.Queue (기본, 단일 워커 프로세스용)
+- redis  : Redis 리스트(LPUSH/BRPOP) + 작업별 키. REDIS_URL 필요.
+           LocalRedisStandIn 은 같은 명령 부분집합을 메모리로 흉내내는 로컬 대체물이다. (테스트/개발용)
+"""
+import os, json, uuid, hmac, time, socket, hashlib, asyncio, ipaddress
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+import httpx
+
+from app.db.database import AsyncSessionLocal
+from app.repository.ad_repo import AdRepo
+from app.schemas.GA_schemas import GenerateAdRequest
+from app.services.GA_Service import generate_ad_copy
+
+GEN_JOB_BACKEND = os.getenv("GEN_JOB_BACKEND", "memory")   # memory | redis
+GEN_JOB_WORKERS = int(os.getenv("GEN_JOB_WORKERS", "4"))
+GEN_JOB_TTL_SEC = int(os.getenv("GEN_JOB_TTL_SEC", "86400"))
+GEN_JOB_CALLBACK_TIMEOUT = float(os.getenv("GEN_JOB_CALLBACK_TIMEOUT_SEC", "10"))
+GEN_JOB_CALLBACK_SECRET = os.getenv("GEN_JOB_CALLBACK_SECRET")
+GEN_JOB_CALLBACK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("GEN_JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+GEN_JOB_REDIS_PREFIX = os.getenv("GEN_JOB_REDIS_PREFIX", "pium:genjob:")
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class InProcessJobQueue:
+    """작업은 RedisJobQueue 와 같이 마지막 갱신 후 GEN_JOB_TTL_SEC 가 지나면 버린다"""
+
+    def __init__(self, ttl: int = GEN_JOB_TTL_SEC):
+        self.ttl = ttl
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # job_id -> (만료 시각, job). 갱신한 작업은 끝으로 옮기므로 앞쪽부터 만료된다
+        self._jobs: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._jobs:
+            job_id, (expires, _) = next(iter(self._jobs.items()))
+            if expires > now:
+                break
+            del self._jobs[job_id]
+
+    def _put(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = (time.monotonic() + self.ttl, job)
+        self._jobs.move_to_end(job["id"])
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        self._evict()
+        self._put(job)
+        await self._queue.put(job["id"])
+
+    async def dequeue(self, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        try:
+            job_id = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._evict()
+        entry = self._jobs.get(job_id)
+        return entry[1] if entry else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        job = await self.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=_now())
+            self._put(job)
+
+
+class LocalRedisStandIn:
+    """RedisJobQueue 가 쓰는 명령(get/set/lpush/brpop)만 구현한 메모리 대체물"""
+
+    def __init__(self):
+        self._kv: Dict[str, str] = {}
+        self._lists: Dict[str, List[str]] = {}
+        self._cond = asyncio.Condition()
+
+    async def get(self, key: str):
+        return self._kv.get(key)
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        self._kv[key] = value
+        return True
+
+    async def lpush(self, key: str, value: str):
+        async with self._cond:
+            self._lists.setdefault(key, []).insert(0, value)
+            self._cond.notify()
+        return len(self._lists[key])
+
+    async def brpop(self, key: str, timeout: float = 0) -> Optional[Tuple[str, str]]:
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: bool(self._lists.get(key))),
+                    timeout or None,
+                )
+            except asyncio.TimeoutError:
+                return None
+            return key, self._lists[key].pop()
+
+
+class RedisJobQueue:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue_key = GEN_JOB_REDIS_PREFIX + "queue"
+
+    def _key(self, job_id: str) -> str:
+        return GEN_JOB_REDIS_PREFIX + job_id
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        await self.redis.set(self._key(job["id"]), json.dumps(job, ensure_ascii=False), ex=GEN_JOB_TTL_SEC)
+        await self.redis.lpush(self.queue_key, job["id"])
+
+    async def dequeue(self, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        item = await self.redis.brpop(self.queue_key, timeout=timeout)
+        if not item:
+            return None
+        job_id = item[1].decode() if isinstance(item[1], bytes) else item[1]
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        job = await self.get(job_id)
+        if job is None:
+            return
+        job.update(fields, updated_at=_now())
+        await self.redis.set(self._key(job_id), json.dumps(job, ensure_ascii=False, default=str), ex=GEN_JOB_TTL_SEC)
+
+
+def _make_queue():
+    if GEN_JOB_BACKEND == "redis":
+        if REDIS_URL:
+            import redis.asyncio as _redis
+            return RedisJobQueue(_redis.from_url(REDIS_URL))
+        print("[job-queue] REDIS_URL 미설정 → LocalRedisStandIn 사용")
+        return RedisJobQueue(LocalRedisStandIn())
+    return InProcessJobQueue()
+
+queue = _make_queue()
+_workers: List[asyncio.Task] = []
+
+
+async def submit_job(*, user_id: int, plan: Optional[str], request: Dict[str, Any],
+                     callback_url: Optional[str] = None) -> Dict[str, Any]:
+    job = {
+        "id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "plan": plan,
+        "request": request,
+        "callback_url": callback_url,
+        "status": "queued",
+        "result": None,
+        "error": None,
+        "created_at": _now(),
+        "updated_at": _now(),
+    }
+    await queue.enqueue(job)
+    return job
+
+
+async def get_job(job_id: str, *, user_id: int) -> Optional[Dict[str, Any]]:
+    job = await queue.get(job_id)
+    if not job or job.get("user_id") != user_id:
+        return None
+    return job
+
+
+async def check_callback_url(url: str) -> None:
+    """callback_url 검사 (SSRF 방지). 안 되면 ValueError"""
+    parsed = httpx.URL(url)
+    host = (parsed.host or "").lower()
+    if parsed.scheme != "https" or not host:
+        raise ValueError("callback_url 은 https URL 이어야 합니다")
+    if parsed.userinfo:
+        raise ValueError("callback_url 에 사용자 정보를 넣을 수 없습니다")
+    if GEN_JOB_CALLBACK_ALLOWED_HOSTS and not any(
+        host == h or (h.startswith(".") and host.endswith(h)) for h in GEN_JOB_CALLBACK_ALLOWED_HOSTS
+    ):
+        raise ValueError(f"허용되지 않은 callback 호스트입니다: {host}")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, parsed.port or 443, type=socket.SOCK_STREAM)
+    except OSError:
+        raise ValueError(f"callback 호스트를 찾을 수 없습니다: {host}")
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback 호스트가 내부 주소로 풀립니다: {host}")
+
+
+def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: job.get(k) for k in ("id", "status", "result", "error", "created_at", "updated_at")}
+
+
+async def _run(job: Dict[str, Any]) -> Dict[str, Any]:
+    req = GenerateAdRequest.model_validate(job["request"])
+    out = await generate_ad_copy(req, plan=job.get("plan"))
+    async with AsyncSessionLocal() as db:
+        try:
+            payload = req.model_dump(mode="json", exclude_none=True)
+            req_id = await AdRepo.save_request(db, user_id=job["user_id"], payload=payload)
+            await AdRepo.save_variants(db, request_id=req_id, variants=out["variants"])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    return {"user_id": job["user_id"], "request_id": req_id, **out}
+
+
+async def _notify(job: Dict[str, Any]) -> None:
+    url = job.get("callback_url")
+    if not url:
+        return
+    body = json.dumps(public_view(job), ensure_ascii=False, default=str).encode()
+    headers = {"Content-Type": "application/json"}
+    if GEN_JOB_CALLBACK_SECRET:
+        headers["X-Pium-Signature"] = hmac.new(GEN_JOB_CALLBACK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    try:
+        await check_callback_url(url)
+        async with httpx.AsyncClient(timeout=GEN_JOB_CALLBACK_TIMEOUT, follow_redirects=False) as client:
+            await client.post(url, content=body, headers=headers)
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"[job-queue] callback 실패 {job['id']}: {e}", flush=True)
+
+
+async def _worker(n: int) -> None:
+    while True:
+        try:
+            job = await queue.dequeue()
+        except Exception as e:
+            # Redis 연결 끊김 등. 워커 태스크가 죽지 않게 잠깐 쉬고 다시
+            print(f"[job-queue] worker{n} dequeue 실패: {e}", flush=True)
+            await asyncio.sleep(1)
+            continue
+        if not job:
+            continue
+        try:
+            await queue.update(job["id"], status="running")
+            try:
+                result = await _run(job)
+                await queue.update(job["id"], status="succeeded", result=result)
+            except Exception as e:
+                print(f"[job-queue] worker{n} job {job['id']} 실패: {e}", flush=True)
+                await queue.update(job["id"], status="failed", error=str(e))
+            await _notify(await queue.get(job["id"]) or job)
+        except Exception as e:
+            print(f"[job-queue] worker{n} job {job['id']} 상태 기록 실패: {e}", flush=True)
+
+
+def start_job_workers(n: int = GEN_JOB_WORKERS) -> None:
+    if _workers:
+        return
+    for i in range(n):
+        _workers.append(asyncio.create_task(_worker(i)))
+
+
+async def stop_job_workers() -> None:
+    for t in _workers:
+        t.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,158 @@
+# backend/app/services/model_router.py
+"""
+광고 카피 생성 모델 라우터
+
+- 요청별로 (요금제, num_variants, 프롬프트 토큰 수)에 맞는 티어를 고르고, 티어의 primary 모델을 쓴다.
+- 모델별 최근 호출(지연/성공 여부)을 슬라이딩 윈도우로 기록해, primary 의 p95 지연이나 오류율이
+  임계치를 넘으면 쿨다운 동안 fallback 모델로 넘긴다. (쿨다운 뒤에는 다시 primary 로 시도)
+- 모델별 지연 히스토그램은 GET /api/generate/models/stats 로 확인한다.
+
+티어 테이블은 GEN_MODEL_TIERS(JSON 배열)로 덮어쓸 수 있다. 위에서부터 처음 맞는 티어를 쓴다.
+  {"name", "plans": [...] | ["*"], "max_variants", "max_prompt_tokens", "primary", "fallback", "temperature"}
+  (max_variants / max_prompt_tokens 를 빼면 제한 없음)
+"""
+import os, json, time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+# 요금제는 free / basic / pro (프론트 PlansPage, tosspayments SUBSCRIPTIONS 의 plan 값).
+# - pro   : gpt-4o. 요금제 페이지에서 "정교한 답변"을 내세우는 건 PRO 뿐이다.
+# - basic : free 와 같은 티어. basic 의 차별점은 이용 횟수/템플릿 수/톤 선택이지 모델이 아니다.
+# - free/basic(그리고 알 수 없는 plan): 캡션 3개 이하 + 프롬프트 1200 토큰 이하(템플릿 ~500 + 보통 브리프)면
+#   기본 모델, 캡션이 많거나 브리프가 긴 요청은 긴 입력/여러 출력을 더 안정적으로 따르는 모델로 보낸다.
+DEFAULT_TIERS: List[Dict[str, Any]] = [
+    {"name": "premium", "plans": ["pro"], "max_variants": 5, "max_prompt_tokens": 6000,
+     "primary": "gpt-4o", "fallback": "gpt-4o-mini", "temperature": 0.7},
+    {"name": "standard", "plans": ["*"], "max_variants": 3, "max_prompt_tokens": 1200,
+     "primary": os.getenv("OPENAI_MODEL", "gpt-4o-mini"), "fallback": "gpt-4.1-mini", "temperature": 0.7},
+    {"name": "large", "plans": ["*"],
+     "primary": "gpt-4.1-mini", "fallback": os.getenv("OPENAI_MODEL", "gpt-4o-mini"), "temperature": 0.7},
+]
+
+GEN_ROUTER_P95_MS = float(os.getenv("GEN_ROUTER_P95_MS", "15000"))
+GEN_ROUTER_MAX_ERROR_RATE = float(os.getenv("GEN_ROUTER_MAX_ERROR_RATE", "0.2"))
+GEN_ROUTER_MIN_SAMPLES = int(os.getenv("GEN_ROUTER_MIN_SAMPLES", "20"))
+GEN_ROUTER_WINDOW = int(os.getenv("GEN_ROUTER_WINDOW", "200"))
+GEN_ROUTER_COOLDOWN_SEC = float(os.getenv("GEN_ROUTER_COOLDOWN_SEC", "120"))
+
+# 히스토그램 버킷 상한(ms). 마지막은 +Inf
+LATENCY_BUCKETS_MS = [250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+
+def _load_tiers() -> List[Dict[str, Any]]:
+    raw = os.getenv("GEN_MODEL_TIERS")
+    if not raw:
+        return DEFAULT_TIERS
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        print(f"[model-router] GEN_MODEL_TIERS 파싱 실패, 기본값 사용: {e}")
+        return DEFAULT_TIERS
+
+TIERS = _load_tiers()
+
+
+class _ModelStats:
+    def __init__(self):
+        self.samples: deque = deque(maxlen=GEN_ROUTER_WINDOW)  # (latency_ms, ok)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.unhealthy_until = 0.0
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        self.samples.append((latency_ms, ok))
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.sum_ms += latency_ms
+        if not ok:
+            self.errors += 1
+
+    def p95(self) -> Optional[float]:
+        lat = sorted(l for l, ok in self.samples if ok)
+        if not lat:
+            return None
+        return lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def healthy(self) -> bool:
+        now = time.monotonic()
+        if now < self.unhealthy_until:
+            return False
+        if len(self.samples) < GEN_ROUTER_MIN_SAMPLES:
+            return True
+        p95 = self.p95()
+        if (p95 is not None and p95 > GEN_ROUTER_P95_MS) or self.error_rate() > GEN_ROUTER_MAX_ERROR_RATE:
+            # 차단 후 창을 비워, 쿨다운이 끝나면 새 표본으로 다시 판단
+            self.unhealthy_until = now + GEN_ROUTER_COOLDOWN_SEC
+            self.samples.clear()
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.count, 1) if self.count else None,
+            "window_p95_ms": self.p95(),
+            "window_error_rate": round(self.error_rate(), 3),
+            "healthy": time.monotonic() >= self.unhealthy_until,
+            "histogram_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+_stats: Dict[str, _ModelStats] = {}
+
+def _get_stats(model: str) -> _ModelStats:
+    if model not in _stats:
+        _stats[model] = _ModelStats()
+    return _stats[model]
+
+
+def _match(tier: Dict[str, Any], plan: str, num_variants: int, prompt_tokens: int) -> bool:
+    plans = tier.get("plans") or ["*"]
+    if "*" not in plans and plan not in plans:
+        return False
+    if tier.get("max_variants") and num_variants > tier["max_variants"]:
+        return False
+    if tier.get("max_prompt_tokens") and prompt_tokens > tier["max_prompt_tokens"]:
+        return False
+    return True
+
+
+def route(*, plan: Optional[str], num_variants: int, prompt_tokens: int,
+          default_model: str, default_temperature: float) -> Dict[str, Any]:
+    """사용할 {model, temperature, tier, failover} 결정"""
+    plan = (plan or "free").lower()
+    tier = next((t for t in TIERS if _match(t, plan, num_variants, prompt_tokens)), None)
+    if tier is None:
+        return {"model": default_model, "temperature": default_temperature, "tier": None, "failover": False}
+
+    model = tier.get("primary") or default_model
+    failover = False
+    if tier.get("fallback") and not _get_stats(model).healthy():
+        model, failover = tier["fallback"], True
+    return {
+        "model": model,
+        "temperature": tier.get("temperature", default_temperature),
+        "tier": tier.get("name"),
+        "failover": failover,
+    }
+
+
+def record(model: str, latency_ms: float, ok: bool) -> None:
+    _get_stats(model).record(latency_ms, ok)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "tiers": TIERS,
+        "models": {m: s.snapshot() for m, s in _stats.items()},
+    }
@@ -0,0 +1,543 @@
+# backend/app/services/object_storage.py
+"""
+오브젝트 스토리지(NCP, S3 호환) 비동기 클라이언트
+
+- 프로세스 전체가 httpx.AsyncClient 커넥션 풀 하나를 공유한다. (keep-alive 로 TLS 핸드셰이크 재사용)
+  요청마다 requests.get/put 을 스레드에서 돌리던 방식은 매번 새 연결을 맺고 스레드 풀도 잡아먹었다.
+- 모든 요청은 SigV4 헤더 서명(app.util.sigv4), 연결 오류/타임아웃/429/5xx 는 지수 백오프로 S3_MAX_RETRIES 번까지 재시도.
+- presigned_url(s) / presigned_post 는 네트워크 없이 URL(과 폼 필드)만 만든다.
+  (인스타그램/프론트에 넘겨줄 GET URL, 브라우저가 스토리지로 바로 올릴 PUT URL·POST 정책)
+  헤더 없는 presigned URL 은 (키, 메서드, 만료 구간)별로 캐시해 두고 수명이 충분히 남아 있으면 그대로 돌려준다.
+  (갤러리에서 썸네일 50장을 다시 불러도 서명을 새로 하지 않음)
+- put_stream 은 청크를 받아 읽는 동안 SHA-256 을 누적한다. 한 파트(S3_MULTIPART_PART_MB) 안에 끝나면 단일 PUT,
+  넘으면 멀티파트 업로드로 파트마다 올리므로 메모리는 파트 크기 하나로 묶인다.
+
+백엔드
+- remote : S3_ENDPOINT 로 실제 요청 (기본)
+- local  : LocalS3StandIn 이 path-style S3 API 부분집합(GET/HEAD/PUT/DELETE, 멀티파트)을 메모리로 흉내낸다.
+           httpx.MockTransport 로 끼우므로 클라이언트 코드 경로는 remote 와 같다. (테스트/개발용)
+"""
+import os, json, time, base64, random, hashlib, asyncio, urllib.parse
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, Tuple, List, AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+
+from app.util.sigv4 import (
+    ALGORITHM, UNSIGNED_PAYLOAD, EMPTY_SHA256, SigV4Signer, amz_dates, canonical_query, quote_path,
+)
+
+load_dotenv()
+
+S3_BACKEND = os.getenv("S3_BACKEND", "remote")   # remote | local
+S3_BUCKET = os.getenv("S3_BUCKET", "pium-dev")
+S3_REGION = os.getenv("S3_REGION", "kr-standard")
+S3_ENDPOINT = os.getenv("S3_ENDPOINT", "https://kr.object.ncloudstorage.com")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+
+# ---- 커넥션 풀 / 타임아웃 / 재시도 ----
+S3_MAX_CONNECTIONS = int(os.getenv("S3_MAX_CONNECTIONS", "64"))
+S3_MAX_KEEPALIVE = int(os.getenv("S3_MAX_KEEPALIVE", "16"))
+S3_KEEPALIVE_EXPIRY = float(os.getenv("S3_KEEPALIVE_EXPIRY_SEC", "30"))
+S3_TIMEOUT = float(os.getenv("S3_TIMEOUT_SEC", "20"))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT_SEC", "5"))
+S3_MAX_RETRIES = int(os.getenv("S3_MAX_RETRIES", "3"))
+S3_RETRY_BASE_SEC = float(os.getenv("S3_RETRY_BASE_SEC", "0.2"))
+# 이 크기를 넘는 업로드는 멀티파트로. S3 규격상 마지막 파트를 빼고는 5MB 이상이어야 한다.
+S3_MULTIPART_PART_SIZE = max(5, int(os.getenv("S3_MULTIPART_PART_MB", "5"))) * 1024 * 1024
+
+# ---- presigned URL 캐시 ----
+S3_PRESIGN_CACHE_MAX_ITEMS = int(os.getenv("S3_PRESIGN_CACHE_MAX_ITEMS", "4096"))
+# 요청한 만료를 이 단위로 올려 서명한다. 600 과 540 처럼 가까운 요청이 같은 URL 을 나눠 쓰게.
+S3_PRESIGN_BUCKET_SEC = max(1, int(os.getenv("S3_PRESIGN_BUCKET_SEC", "300")))
+# 남은 수명이 요청한 만료의 이 비율 이상이면 재사용, 아래로 떨어지면 다시 서명
+S3_PRESIGN_REUSE_FRAC = float(os.getenv("S3_PRESIGN_REUSE_FRAC", "0.5"))
+S3_PRESIGN_MAX_EXPIRES = 7 * 24 * 3600  # SigV4 presigned URL 최대 수명
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class StorageError(Exception):
+    """스토리지가 기대하지 않은 상태 코드를 돌려줌 (재시도 후)"""
+
+    def __init__(self, status: int, detail: str = ""):
+        super().__init__(f"object storage {status}: {detail[:300]}")
+        self.status = status
+        self.detail = detail
+
+
+class ObjectTooLarge(Exception):
+    """put_stream 의 max_bytes 초과 (이미 올린 멀티파트는 중단됨)"""
+
+
+async def _once(data: bytes):
+    """
+    본문을 한 번 내보내고 끝나는 스트림.
+    httpx 응답은 요청(본문 포함)과 참조 순환을 이뤄 GC 전까지 남으므로, bytes 를 직접 넘기면
+    멀티파트 파트가 업로드 후에도 쌓인다. 제너레이터는 다 읽히면 본문 참조를 놓는다.
+    """
+    yield data
+
+def _xml_find(text: str, tag: str) -> Optional[str]:
+    """네임스페이스와 관계없이 첫 번째 tag 의 텍스트"""
+    for el in ET.fromstring(text).iter():
+        if el.tag.rsplit("}", 1)[-1] == tag:
+            return el.text
+    return None
+
+
+class _PresignCache:
+    """(키, 메서드, 만료 구간) → (URL, 만료 시각). 만료 시각은 서명 검증과 같은 벽시계 기준"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: "OrderedDict[Tuple[str, str, int], Tuple[str, float]]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, k: Tuple[str, str, int], min_remaining: float, now: float) -> Optional[Tuple[str, float]]:
+        item = self._data.get(k)
+        if item is None or item[1] - now < min_remaining:
+            self.misses += 1
+            return None
+        self._data.move_to_end(k)
+        self.hits += 1
+        return item
+
+    def set(self, k: Tuple[str, str, int], url: str, expires_at: float) -> None:
+        self._data[k] = (url, expires_at)
+        self._data.move_to_end(k)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
+class S3Client:
+    def __init__(
+        self,
+        endpoint: str = S3_ENDPOINT,
+        bucket: str = S3_BUCKET,
+        region: str = S3_REGION,
+        access_key: str = S3_ACCESS_KEY,
+        secret_key: str = S3_SECRET_KEY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = S3_MAX_RETRIES,
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.host = urllib.parse.urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.region = region
+        # 파생 서명 키는 sigv4 모듈이 (날짜, 리전, 서비스)별로 캐시한다
+        self.signer = SigV4Signer(access_key, secret_key, region)
+        self.max_retries = max_retries
+        self._presigned = _PresignCache(S3_PRESIGN_CACHE_MAX_ITEMS)
+        self._http = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=S3_MAX_CONNECTIONS,
+                max_keepalive_connections=S3_MAX_KEEPALIVE,
+                keepalive_expiry=S3_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(S3_TIMEOUT, connect=S3_CONNECT_TIMEOUT),
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    # ---- 서명 ----
+    def _raw_path(self, key: str) -> str:
+        """서명용 경로 (인코딩 전)"""
+        return f"/{self.bucket}/{key}"
+
+    def _path(self, key: str) -> str:
+        return quote_path(self._raw_path(key))
+
+    def _signed_headers(self, method: str, key: str, params: Dict[str, str],
+                        payload_hash: str, headers: Dict[str, str]) -> Dict[str, str]:
+        # x-amz-* 만 서명에 넣고 나머지(Content-Type, If-None-Match 등)는 서명 없이 붙인다
+        amz = {k: v for k, v in headers.items() if k.lower().startswith("x-amz-")}
+        return {
+            **headers,
+            **self.signer.sign_headers(method, self.host, self._raw_path(key),
+                                       query=params, headers=amz, payload_hash=payload_hash),
+        }
+
+    def presigned_url(self, key: str, expires: int = 600, method: str = "GET",
+                      headers: Optional[Dict[str, str]] = None) -> str:
+        """
+        네트워크 없이 서명된 URL 생성 (payload 는 UNSIGNED-PAYLOAD).
+        headers 를 주면 서명에 포함되므로, URL 을 쓰는 쪽이 같은 값으로 보내야 한다. (PUT 의 Content-Type 고정 등)
+        """
+        return self.presigned_urls([key], expires=expires, method=method, headers=headers)[0]
+
+    def presigned_urls(self, keys: List[str], expires: int = 600, method: str = "GET",
+                       headers: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        여러 키를 한 번에 presign (캐러셀 게시, 갤러리 목록 등). 순서는 keys 그대로.
+        headers 가 없으면 캐시를 거친다 (cached_presigned_urls). 헤더를 고정하는 업로드 URL 은 매번 새로 서명.
+        """
+        if not headers:
+            return [url for url, _ in self.cached_presigned_urls(keys, expires=expires, method=method)]
+        queries = self.signer.presign_many(method, self.host, [self._raw_path(k) for k in keys],
+                                           expires=expires, headers=headers)
+        return [f"{self.endpoint}{self._path(k)}?{q}" for k, q in zip(keys, queries)]
+
+    def cached_presigned_urls(self, keys: List[str], expires: int = 600,
+                              method: str = "GET") -> List[Tuple[str, int]]:
+        """
+        [(URL, 남은 수명 초)]. 만료는 S3_PRESIGN_BUCKET_SEC 단위로 올려 서명하고,
+        남은 수명이 expires * S3_PRESIGN_REUSE_FRAC 이상인 캐시 항목은 그대로 돌려준다.
+        캐시에 없거나 만료가 가까운 키만 모아 한 번에 다시 서명한다.
+        """
+        bucket = min(-(-expires // S3_PRESIGN_BUCKET_SEC) * S3_PRESIGN_BUCKET_SEC, S3_PRESIGN_MAX_EXPIRES)
+        now = time.time()
+        min_remaining = expires * S3_PRESIGN_REUSE_FRAC
+        out: List[Optional[Tuple[str, int]]] = []
+        missing: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            hit = self._presigned.get((key, method, bucket), min_remaining, now)
+            if hit is None:
+                missing.setdefault(key, []).append(i)
+                out.append(None)
+            else:
+                out.append((hit[0], int(hit[1] - now)))
+
+        if missing:
+            # X-Amz-Date 는 초 단위라 그 초의 시작부터 수명이 센다
+            signed_at = datetime.fromtimestamp(int(now), timezone.utc)
+            fresh = list(missing)
+            queries = self.signer.presign_many(method, self.host, [self._raw_path(k) for k in fresh],
+                                               expires=bucket, now=signed_at)
+            expires_at = signed_at.timestamp() + bucket
+            for key, q in zip(fresh, queries):
+                url = f"{self.endpoint}{self._path(key)}?{q}"
+                self._presigned.set((key, method, bucket), url, expires_at)
+                for i in missing[key]:
+                    out[i] = (url, int(expires_at - now))
+        return out  # type: ignore[return-value]
+
+    def presigned_post(self, key: str, content_type: str, max_bytes: int, expires: int = 600) -> Dict[str, Any]:
+        """
+        브라우저 폼 업로드용 POST 정책. 키/Content-Type 고정, 크기는 1..max_bytes 로 스토리지가 검사한다.
+        반환: {"url", "fields"}  (fields 를 폼에 넣고 마지막에 file 필드를 붙여 POST)
+        """
+        now = datetime.now(timezone.utc)
+        amz_date, date_stamp = amz_dates(now)
+        fields = {
+            "key": key,
+            "Content-Type": content_type,
+            "x-amz-algorithm": ALGORITHM,
+            "x-amz-credential": self.signer.credential(date_stamp),
+            "x-amz-date": amz_date,
+        }
+        policy = {
+            "expiration": (now + timedelta(seconds=expires)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "conditions": [
+                {"bucket": self.bucket},
+                *({k: v} for k, v in fields.items()),
+                ["content-length-range", 1, max_bytes],
+            ],
+        }
+        encoded = base64.b64encode(json.dumps(policy, separators=(",", ":")).encode()).decode()
+        signature = self.signer.sign_string(encoded, date_stamp)
+        return {
+            "url": f"{self.endpoint}/{self.bucket}",
+            "fields": {**fields, "policy": encoded, "x-amz-signature": signature},
+        }
+
+    # ---- 요청 ----
+    async def request(
+        self,
+        method: str,
+        key: str,
+        *,
+        body: bytes = b"",
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        payload_hash: Optional[str] = None,
+    ) -> httpx.Response:
+        """
+        서명 + 재시도. 상태 코드는 호출하는 쪽에서 본다.
+        연결 오류/타임아웃과 RETRY_STATUS 만 재시도하고, 마지막 시도의 응답(또는 예외)을 그대로 돌려준다.
+        """
+        params = params or {}
+        headers = headers or {}
+        if payload_hash is None:
+            payload_hash = hashlib.sha256(body).hexdigest() if body else EMPTY_SHA256
+        # 서명한 쿼리 문자열을 그대로 보낸다 (httpx 인코딩과 어긋나지 않게)
+        url = f"{self.endpoint}{self._path(key)}" + (f"?{canonical_query(params)}" if params else "")
+
+        for attempt in range(self.max_retries + 1):
+            # 재시도 사이에 시각이 바뀔 수 있으므로 매번 다시 서명
+            signed = self._signed_headers(method, key, params, payload_hash, headers)
+            if body:
+                signed["Content-Length"] = str(len(body))
+            try:
+                r = await self._http.request(method, url, headers=signed, content=_once(body) if body else None)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if r.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    return r
+            await asyncio.sleep(S3_RETRY_BASE_SEC * (2 ** attempt) * (0.5 + random.random()))
+        raise AssertionError("unreachable")
+
+    async def get(self, key: str, *, if_none_match: Optional[str] = None) -> httpx.Response:
+        """200 또는 (if_none_match 가 맞으면) 304 응답. 그 외는 StorageError"""
+        headers = {"If-None-Match": if_none_match} if if_none_match else {}
+        r = await self.request("GET", key, headers=headers)
+        if r.status_code == 200 or (r.status_code == 304 and if_none_match):
+            return r
+        raise StorageError(r.status_code, r.text)
+
+    async def get_bytes(self, key: str) -> bytes:
+        return (await self.get(key)).content
+
+    async def put(self, key: str, data: bytes, content_type: str) -> Optional[str]:
+        """업로드하고 ETag 반환"""
+        r = await self.request("PUT", key, body=data, headers={"Content-Type": content_type})
+        if r.status_code not in (200, 201):
+            raise StorageError(r.status_code, r.text)
+        return r.headers.get("ETag")
+
+    async def put_stream(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        *,
+        max_bytes: Optional[int] = None,
+        part_size: int = S3_MULTIPART_PART_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        청크 스트림을 업로드한다. 파일 전체를 메모리에 모으지 않는다.
+        - 파트 하나 분량까지만 버퍼에 모으면서 SHA-256 을 누적 (서명용으로 다시 읽지 않음)
+        - part_size 안에 끝나면 단일 PUT, 넘으면 멀티파트 (파트마다 서명/재시도)
+        - max_bytes 를 넘으면 ObjectTooLarge. 시작한 멀티파트는 중단(abort)한다.
+        반환: {"etag", "size", "sha256", "parts"}  (parts 는 단일 PUT 이면 1)
+        """
+        total = hashlib.sha256()
+        part_hash = hashlib.sha256()
+        buf: List[bytes] = []
+        buf_len = size = 0
+        upload_id: Optional[str] = None
+        parts: List[Tuple[int, str]] = []
+
+        async def flush() -> None:
+            nonlocal upload_id, part_hash, buf, buf_len
+            if upload_id is None:
+                upload_id = await self._create_multipart(key, content_type)
+            n = len(parts) + 1
+            body = b"".join(buf)
+            buf, buf_len = [], 0  # join 뒤에는 청크 목록을 바로 놓아 준다
+            r = await self.request("PUT", key, body=body,
+                                   params={"partNumber": str(n), "uploadId": upload_id},
+                                   payload_hash=part_hash.hexdigest())
+            if r.status_code != 200:
+                raise StorageError(r.status_code, r.text)
+            parts.append((n, r.headers.get("ETag", "")))
+            part_hash = hashlib.sha256()
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ObjectTooLarge(f"{max_bytes} bytes 초과")
+                while chunk:
+                    piece, chunk = chunk[:part_size - buf_len], chunk[part_size - buf_len:]
+                    total.update(piece)
+                    part_hash.update(piece)
+                    buf.append(piece)
+                    buf_len += len(piece)
+                    if buf_len == part_size:
+                        await flush()
+
+            if upload_id is None:
+                etag = await self._put_hashed(key, b"".join(buf), content_type, total.hexdigest())
+                return {"etag": etag, "size": size, "sha256": total.hexdigest(), "parts": 1}
+            if buf_len:
+                await flush()
+            etag = await self._complete_multipart(key, upload_id, parts)
+            return {"etag": etag, "size": size, "sha256": total.hexdigest(), "parts": len(parts)}
+        except BaseException:
+            if upload_id is not None:
+                try:
+                    await self.request("DELETE", key, params={"uploadId": upload_id})
+                except Exception as e:
+                    print(f"[object-storage] 멀티파트 중단 실패 {key}: {e}", flush=True)
+            raise
+
+    async def _put_hashed(self, key: str, data: bytes, content_type: str, sha256_hex: str) -> Optional[str]:
+        r = await self.request("PUT", key, body=data, headers={"Content-Type": content_type},
+                               payload_hash=sha256_hex)
+        if r.status_code not in (200, 201):
+            raise StorageError(r.status_code, r.text)
+        return r.headers.get("ETag")
+
+    async def _create_multipart(self, key: str, content_type: str) -> str:
+        r = await self.request("POST", key, params={"uploads": ""}, headers={"Content-Type": content_type})
+        if r.status_code != 200:
+            raise StorageError(r.status_code, r.text)
+        upload_id = _xml_find(r.text, "UploadId")
+        if not upload_id:
+            raise StorageError(r.status_code, "UploadId 없음: " + r.text)
+        return upload_id
+
+    async def _complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> Optional[str]:
+        body = (
+            "<CompleteMultipartUpload>"
+            + "".join(f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>" for n, etag in parts)
+            + "</CompleteMultipartUpload>"
+        ).encode()
+        r = await self.request("POST", key, body=body, params={"uploadId": upload_id},
+                               headers={"Content-Type": "application/xml"})
+        # S3 는 200 으로 응답하고 본문에 Error 를 넣는 경우가 있다
+        if r.status_code != 200 or "<Error>" in r.text:
+            raise StorageError(r.status_code, r.text)
+        return _xml_find(r.text, "ETag")
+
+    async def head(self, key: str) -> Optional[httpx.Headers]:
+        """있으면 응답 헤더, 없으면(404) None"""
+        r = await self.request("HEAD", key)
+        if r.status_code == 200:
+            return r.headers
+        if r.status_code == 404:
+            return None
+        raise StorageError(r.status_code)
+
+    async def delete(self, key: str) -> None:
+        r = await self.request("DELETE", key)
+        if r.status_code not in (200, 204, 404):
+            raise StorageError(r.status_code, r.text)
+
+
+class LocalS3StandIn:
+    """
+    path-style S3 API 의 부분집합을 메모리로 흉내내는 대체물. httpx.MockTransport(stand_in.handle) 로 쓴다.
+    - GET(If-None-Match → 304) / HEAD / PUT / DELETE
+    - 멀티파트: POST ?uploads / PUT ?partNumber&uploadId / POST ?uploadId (완료) / DELETE ?uploadId (중단)
+    - x-amz-content-sha256 가 본문 해시와 다르면 400 (UNSIGNED-PAYLOAD 는 통과), Authorization 이 없으면 403
+    - fail_next(n, status) 로 다음 n 개 요청을 실패시켜 재시도 경로를 확인할 수 있다.
+    """
+
+    def __init__(self, bucket: str = S3_BUCKET):
+        self.bucket = bucket
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}  # uploadId -> {"key", "content_type", "parts": {n: bytes}}
+        self.requests: List[Tuple[str, str]] = []   # (method, key) 요청 기록
+        self._failures: List[int] = []
+
+    def fail_next(self, n: int = 1, status: int = 503) -> None:
+        self._failures.extend([status] * n)
+
+    def _error(self, status: int, code: str) -> httpx.Response:
+        return httpx.Response(status, text=f"<Error><Code>{code}</Code></Error>",
+                              headers={"Content-Type": "application/xml"})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        bucket, _, key = urllib.parse.unquote(request.url.path).lstrip("/").partition("/")
+        self.requests.append((request.method, key))
+        if self._failures:
+            return self._error(self._failures.pop(0), "ServiceUnavailable")
+        if bucket != self.bucket:
+            return self._error(404, "NoSuchBucket")
+        if "authorization" not in request.headers and "X-Amz-Signature" not in request.url.params:
+            return self._error(403, "AccessDenied")
+
+        body = request.read()
+        claimed = request.headers.get("x-amz-content-sha256", UNSIGNED_PAYLOAD)
+        if claimed != UNSIGNED_PAYLOAD and claimed != hashlib.sha256(body).hexdigest():
+            return self._error(400, "XAmzContentSHA256Mismatch")
+        params = request.url.params
+        if "uploads" in params or "uploadId" in params:
+            return self._multipart(request, key, body)
+
+        if request.method == "PUT":
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            self.objects[key] = {
+                "body": body,
+                "etag": etag,
+                "content_type": request.headers.get("content-type", "application/octet-stream"),
+            }
+            return httpx.Response(200, headers={"ETag": etag})
+
+        obj = self.objects.get(key)
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return httpx.Response(204)
+        if obj is None:
+            return self._error(404, "NoSuchKey")
+        headers = {"ETag": obj["etag"], "Content-Type": obj["content_type"], "Content-Length": str(len(obj["body"]))}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        if request.method == "GET":
+            if request.headers.get("if-none-match") == obj["etag"]:
+                return httpx.Response(304, headers={"ETag": obj["etag"]})
+            return httpx.Response(200, headers=headers, content=obj["body"])
+        return self._error(405, "MethodNotAllowed")
+
+    def _multipart(self, request: httpx.Request, key: str, body: bytes) -> httpx.Response:
+        params = request.url.params
+        if request.method == "POST" and "uploads" in params:
+            upload_id = hashlib.sha1(f"{key}:{len(self.uploads)}:{random.random()}".encode()).hexdigest()
+            self.uploads[upload_id] = {
+                "key": key,
+                "content_type": request.headers.get("content-type", "application/octet-stream"),
+                "parts": {},
+            }
+            return httpx.Response(200, text=(
+                "<InitiateMultipartUploadResult>"
+                f"<Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                "</InitiateMultipartUploadResult>"
+            ))
+
+        upload = self.uploads.get(params.get("uploadId", ""))
+        if upload is None or upload["key"] != key:
+            return self._error(404, "NoSuchUpload")
+        if request.method == "PUT":
+            upload["parts"][int(params["partNumber"])] = body
+            return httpx.Response(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if request.method == "DELETE":
+            del self.uploads[params["uploadId"]]
+            return httpx.Response(204)
+        if request.method == "POST":
+            root = ET.fromstring(body)
+            numbers = [int(el.text) for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "PartNumber"]
+            if numbers != sorted(numbers) or any(n not in upload["parts"] for n in numbers):
+                return self._error(400, "InvalidPart")
+            data = [upload["parts"][n] for n in numbers]
+            if any(len(d) < 5 * 1024 * 1024 for d in data[:-1]):
+                return self._error(400, "EntityTooSmall")
+            digest = hashlib.md5(b"".join(hashlib.md5(d).digest() for d in data)).hexdigest()
+            etag = f'"{digest}-{len(data)}"'
+            self.objects[key] = {"body": b"".join(data), "etag": etag, "content_type": upload["content_type"]}
+            del self.uploads[params["uploadId"]]
+            return httpx.Response(200, text=(
+                f"<CompleteMultipartUploadResult><Key>{key}</Key><ETag>{etag}</ETag></CompleteMultipartUploadResult>"
+            ))
+        return self._error(405, "MethodNotAllowed")
+
+
+# S3_BACKEND=local 일 때 storage 가 붙어 있는 대체물 (개발 중 내용 확인/미리 채우기용)
+local_stand_in: Optional[LocalS3StandIn] = None
+
+def _make_client() -> S3Client:
+    global local_stand_in
+    if S3_BACKEND == "local":
+        print("[object-storage] S3_BACKEND=local → LocalS3StandIn 사용")
+        local_stand_in = LocalS3StandIn()
+        return S3Client(transport=httpx.MockTransport(local_stand_in.handle))
+    return S3Client()
+
+storage = _make_client()
+
+async def aclose_storage() -> None:
+    """앱 종료 시 커넥션 풀 정리"""
+    await storage.aclose()
@@ -0,0 +1,178 @@
+# backend/app/services/openai_limiter.py
+"""
+OpenAI 호출용 적응형 레이트 리미터 + 재시도
+
+- RPM / TPM 두 개의 토큰 버킷. 요청 전 (1 요청, 예상 토큰 수)를 확보하고,
+  용량이 부족하면 실패시키지 않고 FIFO 로 대기(최대 OPENAI_QUEUE_MAX_WAIT_SEC)한다.
+- 응답의 x-ratelimit-* 헤더로 버킷 용량/잔량을 실제 계정 한도에 맞춘다.
+- 429 / 5xx / 연결 오류는 지터를 섞은 지수 백오프로 재시도한다. (Retry-After 헤더 우선)
+"""
+import os, re, time, random, asyncio
+from typing import Optional, Mapping, Callable, Awaitable, TypeVar
+
+from openai import RateLimitError, APIStatusError, APIConnectionError, APITimeoutError
+
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_QUEUE_MAX_WAIT_SEC = float(os.getenv("OPENAI_QUEUE_MAX_WAIT_SEC", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE_SEC = float(os.getenv("OPENAI_BACKOFF_BASE_SEC", "0.5"))
+OPENAI_BACKOFF_MAX_SEC = float(os.getenv("OPENAI_BACKOFF_MAX_SEC", "20"))
+
+T = TypeVar("T")
+
+
+class RateLimitQueueTimeout(Exception):
+    """대기열에서 OPENAI_QUEUE_MAX_WAIT_SEC 안에 용량을 확보하지 못함"""
+
+
+class TokenBucket:
+    """분당 capacity 만큼 채워지는 버킷. level 이 음수가 되지 않도록 대기 후 차감한다."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)  # 한 번에 용량보다 큰 요청도 언젠가는 통과
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """서버가 알려준 한도/잔량으로 보정 (잔량은 우리 추정보다 작을 때만 반영)"""
+        self._refill()
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+    def drain(self) -> None:
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def _parse_duration(v: Optional[str]) -> Optional[float]:
+    """'6m0s', '1.5s', '20ms' 형식"""
+    if not v:
+        return None
+    parts = _DURATION.findall(v)
+    if not parts:
+        try:
+            return float(v)
+        except ValueError:
+            return None
+    return sum(float(n) * _UNIT[u] for n, u in parts)
+
+def _num(v: Optional[str]) -> Optional[float]:
+    try:
+        return float(v) if v is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rpm: float = OPENAI_RPM, tpm: float = OPENAI_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = asyncio.Lock()  # 대기 순서를 FIFO 로 유지
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: int, max_wait: float = OPENAI_QUEUE_MAX_WAIT_SEC) -> None:
+        deadline = time.monotonic() + max_wait
+        async with self._lock:
+            while True:
+                wait = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitQueueTimeout(f"OpenAI 요청 대기 한도({max_wait:.0f}s) 초과")
+                await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        self.requests.sync(
+            _num(headers.get("x-ratelimit-limit-requests")),
+            _num(headers.get("x-ratelimit-remaining-requests")),
+        )
+        self.tokens.sync(
+            _num(headers.get("x-ratelimit-limit-tokens")),
+            _num(headers.get("x-ratelimit-remaining-tokens")),
+        )
+
+    def penalize(self, headers: Optional[Mapping[str, str]]) -> float:
+        """429 수신: 버킷을 비우고 서버가 알려준 리셋 시점까지 전체 대기열을 멈춘다."""
+        headers = headers or {}
+        retry_ms = _num(headers.get("retry-after-ms"))
+        pause = (
+            (retry_ms / 1000 if retry_ms else None)
+            or _parse_duration(headers.get("retry-after"))
+            or max(
+                _parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                _parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+            )
+            or 1.0
+        )
+        self.requests.drain()
+        self.tokens.drain()
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        return pause
+
+
+limiter = AdaptiveRateLimiter()
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(e, APIStatusError) and e.status_code >= 500
+
+
+def _backoff(attempt: int) -> float:
+    """full jitter: 0 ~ min(max, base * 2^attempt)"""
+    return random.uniform(0, min(OPENAI_BACKOFF_MAX_SEC, OPENAI_BACKOFF_BASE_SEC * (2 ** attempt)))
+
+
+async def call_with_retry(fn: Callable[[], Awaitable[T]], *, tokens: int) -> T:
+    """
+    fn 은 매 시도마다 새 요청을 보내는 코루틴 팩토리.
+    재시도 불가 오류나 재시도 한도 초과 시 마지막 예외를 그대로 올린다.
+    """
+    attempt = 0
+    while True:
+        await limiter.acquire(tokens)
+        try:
+            return await fn()
+        except Exception as e:
+            if not _retryable(e) or attempt >= OPENAI_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            if isinstance(e, RateLimitError):
+                # 대기열 전체를 리셋 시점까지 멈추므로, 여기서는 지터만 더한다
+                limiter.penalize(getattr(e.response, "headers", None))
+            print(f"[openai-retry] {type(e).__name__} → {delay:.2f}s 후 재시도 ({attempt + 1}/{OPENAI_MAX_RETRIES})")
+            attempt += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,153 @@
+# backend/app/services/prompt_template.py
+"""
+광고 카피 프롬프트 템플릿 + 토큰 예산
+
+- 템플릿은 모듈 로드 시 한 번만 파싱(정적 조각/자리표시자 분리)하고, 요청마다 join 만 한다.
+- 사용자 입력 섹션(가게 소개, 참고 링크, 프로모션 등)은 섹션별 토큰 예산을 넘으면 결정적으로 자른다.
+  · 문자열 섹션: 토큰 단위로 앞에서부터 남기고 '…' 부착
+  · 목록 섹션: 항목 단위로 앞에서부터 예산 안에 드는 것만 남김 (URL 이 중간에서 잘리지 않도록)
+- 토크나이저는 tiktoken(requirements.txt)을 쓴다. import 나 인코딩 로드가 실패하면(오프라인에서 인코딩 파일을
+  못 받는 경우 등) UTF-8 바이트 기반 근사치로 대신한다.
+"""
+import os, re, math
+from typing import Dict, List, Optional, Iterable, Tuple
+
+try:  # 설치/인코딩 로드 실패 시에만 근사치
+    import tiktoken
+    _enc = tiktoken.get_encoding(os.getenv("PROMPT_TOKENIZER", "o200k_base"))
+except Exception:
+    _enc = None
+
+ELLIPSIS = "…"
+
+# 섹션별 토큰 예산 (환경변수로 조정)
+SECTION_BUDGETS: Dict[str, int] = {
+    "store_intro": int(os.getenv("PROMPT_BUDGET_STORE_INTRO", "400")),
+    "reference_links": int(os.getenv("PROMPT_BUDGET_REFERENCE_LINKS", "150")),
+    "promotions": int(os.getenv("PROMPT_BUDGET_PROMOTIONS", "150")),
+    "product_service_keywords": int(os.getenv("PROMPT_BUDGET_PS_KEYWORDS", "80")),
+    "target_customers": int(os.getenv("PROMPT_BUDGET_TARGETS", "60")),
+    "area_keywords": int(os.getenv("PROMPT_BUDGET_AREA_KEYWORDS", "60")),
+    "image_urls": int(os.getenv("PROMPT_BUDGET_IMAGE_URLS", "150")),
+    "avoid_texts": int(os.getenv("PROMPT_BUDGET_AVOID_TEXTS", "150")),
+}
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _enc is not None:
+        return len(_enc.encode(text))
+    # 근사치: 한글 1글자(3바이트) ≈ 1토큰, 영문 3~4글자 ≈ 1토큰
+    return math.ceil(len(text.encode("utf-8")) / 3)
+
+
+def truncate_text(text: str, budget: int) -> Tuple[str, int, bool]:
+    """(잘린 텍스트, 토큰 수, 잘렸는지)"""
+    text = text or ""
+    n = count_tokens(text)
+    if n <= budget:
+        return text, n, False
+    keep = max(budget - count_tokens(ELLIPSIS), 0)
+    if _enc is not None:
+        cut = _enc.decode(_enc.encode(text)[:keep])
+    else:
+        # 근사 토크나이저는 단조 증가하므로 이분 탐색으로 최대 길이 결정
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(text[:mid]) <= keep:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text[:lo]
+    out = cut.rstrip() + ELLIPSIS
+    return out, count_tokens(out), True
+
+
+def fit_items(items: Optional[Iterable], sep: str, budget: int, limit: Optional[int] = None) -> Tuple[List[str], int, bool]:
+    """목록을 항목 단위로 예산 안에 맞춘다. (남은 항목, 토큰 수, 잘렸는지)"""
+    all_vals = [str(x) for x in (items or []) if x is not None]
+    vals = all_vals[:limit] if limit is not None else all_vals
+    kept: List[str] = []
+    used = 0
+    sep_cost = count_tokens(sep)
+    for v in vals:
+        cost = count_tokens(v) + (sep_cost if kept else 0)
+        if used + cost > budget:
+            break
+        kept.append(v)
+        used += cost
+    return kept, used, len(kept) < len(all_vals)
+
+
+class PromptTemplate:
+    """'{name}' 자리표시자를 가진 템플릿. 파싱은 생성 시 한 번만 한다."""
+    _FIELD = re.compile(r"\{(\w+)\}")
+
+    def __init__(self, source: str):
+        pieces = self._FIELD.split(source)
+        self.statics: List[str] = pieces[0::2]
+        self.fields: List[str] = pieces[1::2]
+
+    def render(self, values: Dict[str, object]) -> str:
+        out = [self.statics[0]]
+        for name, static in zip(self.fields, self.statics[1:]):
+            out.append(str(values[name]))
+            out.append(static)
+        return "".join(out)
+
+
+AD_PROMPT = PromptTemplate("""
+[목표]
+인스타그램 피드용 광고 캡션 {num_variants}개를 작성한다.
+
+[브리프]
+- 가게명: {store_name}
+- 업종: {category}
+- 지역/상권 키워드: {area_kw}
+- 주소: {address}
+- 가격대: {price}
+- 영업 시간: {business_hours}
+- 가게 소개: {store_intro}
+- 제품/서비스 키워드: {ps_kw}
+- 타깃 고객: {targets}
+- 진행 중 프로모션/이벤트: {promos}
+- 인스타그램 ID: {ig}{img_hint}
+- 참고 링크:
+{ref_links}
+{avoid}
+
+[톤]
+{tone_rule}{style_hint}
+
+[작성 규칙]
+- 한국어, 300자 이내. 자연스럽게 지역/상권 키워드 최소 1개 포함.
+- 홍보글은 가게 특성과 고객에게 줄 가치가 명확히 드러나야 함
+- 해시태그는 검색 최적화(SEO) 관점에서 작성
+- 가게 특징(업종·메인 서비스)과 혜택/차별점을 1~2개로 명확히.
+- 이모지는 과하지 않게 핵심 위치에만 사용(톤에 맞게).
+- 금지: 과장된 단정(최고, 100% 보장, 완벽), 과도한 특수문자, 허위·건강 효능.
+- 해시태그는 마지막 줄에만, 띄어쓰기로 구분하여 정확히 {hashtag_limit}개 생성.
+- 해시태그는 #기호로만 시작하고 문장부호/이모지 금지.
+- 홍보글 밑, 해시태그 전 반드시 가게명과 가게 주소를 각각 📍 이모지 뒤에 표기할 것. (ex. 📍 묭이카페\n 📍 소행성 행성로 88-2)
+- 가게 인스타그램 아이디는 본문에 포함하지 말 것.
+
+{output_format}""")
+
+# 구분자 포맷 (기본, 스트리밍 가능)
+OUTPUT_FORMAT_DELIMITED = PromptTemplate("""[출력 포맷]
+다음 형식을 각 캡션마다 엄격히 따르고, 각 캡션 블록 끝에 '{delim}' 구분자를 붙인다.
+
+캡션 본문 한 문단
+빈 줄 1개
+#해시태그들(#으로 시작, 공백으로 구분)
+{delim}
+""")
+
+# structured output(JSON schema) 포맷
+OUTPUT_FORMAT_JSON = """[출력 포맷]
+JSON 으로만 답한다. variants 배열에 캡션마다 객체 하나씩 넣는다.
+- body: 해시태그를 제외한 캡션 본문 (📍 가게명/주소 줄 포함)
+- hashtags: '#' 없이 해시태그 단어만 담은 배열
+"""
@@ -0,0 +1,144 @@
+# backend/app/services/upload_processing.py
+"""
+업로드 후처리 (파생본 생성) 워커 풀
+
+- 업로드가 ready 가 되면(/files/upload 직후, /files/finalize 확인 후) 키를 큐에 넣는다.
+  DB 에는 derivatives_status=queued 로 남겨 두므로 서버가 재시작돼도 resume_upload_processing 이 다시 넣는다.
+- UPLOAD_PROCESS_WORKERS 개의 asyncio 태스크가 원본을 받아 image_derivatives.make_derivatives 를 돌리고,
+  파생본을 {원본 이름}_{짧은 변}.jpg 로 올린 뒤 UploadedObject.derivatives 에 키/크기/blurhash/LQIP 를 기록한다.
+- 디코드/리사이즈/인코드는 GIL 을 잡으므로 compose_engine 처럼 프로세스 풀(UPLOAD_PROCESS_PROCS)에서 돌린다.
+  0 이면 스레드에서 같은 코드를 돌린다. (개발/디버깅용)
+- 이후 읽기(인스타그램 image_url, 카드 사진 슬롯, 프론트 목록)는 feed_keys / 파생본 URL 로 작은 쪽을 쓴다.
+"""
+import os, asyncio, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, List
+
+import httpx
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db.database import AsyncSessionLocal
+from app.repository.upload_repo import UploadRepo
+from app.services.image_derivatives import DERIVATIVES, make_derivatives
+from app.services.object_storage import storage, StorageError
+
+UPLOAD_PROCESS_WORKERS = int(os.getenv("UPLOAD_PROCESS_WORKERS", "2"))
+UPLOAD_PROCESS_PROCS = int(os.getenv("UPLOAD_PROCESS_PROCS", str(min(2, os.cpu_count() or 1))))
+
+
+def derivative_key(key: str, name: str) -> str:
+    """user-1/.../abc.jpg → user-1/.../abc_1080.jpg (원본과 같은 유저 경로 아래)"""
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"{stem}_{DERIVATIVES[name]['short']}.jpg"
+
+
+class UploadProcessor:
+    def __init__(self, workers: int = UPLOAD_PROCESS_WORKERS, procs: int = UPLOAD_PROCESS_PROCS):
+        self.workers = workers
+        self.procs = procs
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        if self.procs > 0 and self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.procs, mp_context=multiprocessing.get_context("spawn"))
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def enqueue(self, keys: List[str]) -> None:
+        """DB 에 queued 로 커밋된 뒤에 부른다. 워커가 안 떠 있으면 다음 시작 때 resume 이 처리"""
+        if self._queue is None:
+            return
+        for key in keys:
+            self._queue.put_nowait(key)
+
+    async def join(self) -> None:
+        """큐에 있는 작업이 모두 끝날 때까지 (스크립트/점검용)"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _derive(self, data: bytes) -> Dict[str, Any]:
+        if self._pool is None:
+            return await asyncio.to_thread(make_derivatives, data)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, make_derivatives, data)
+        except BrokenProcessPool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.procs, mp_context=multiprocessing.get_context("spawn"))
+            raise RuntimeError("후처리 워커 프로세스가 비정상 종료되었습니다")
+
+    async def process(self, key: str) -> Dict[str, Any]:
+        """원본 하나 → 파생본 업로드 → derivatives 값 (DB 기록은 호출하는 쪽)"""
+        out = await self._derive(await storage.get_bytes(key))
+        variants = out.pop("variants")
+
+        async def put(name: str, v: Dict[str, Any]) -> None:
+            await storage.put(derivative_key(key, name), v["bytes"], v["content_type"])
+
+        await asyncio.gather(*(put(name, v) for name, v in variants.items()))
+        return {
+            **{name: {"rel": derivative_key(key, name), "width": v["width"], "height": v["height"],
+                      "bytes": len(v["bytes"])}
+               for name, v in variants.items()},
+            **out,
+        }
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                try:
+                    values = {"derivatives": await self.process(key), "derivatives_status": "ready"}
+                except (StorageError, httpx.HTTPError, OSError, ValueError, RuntimeError) as e:
+                    # 디코드 실패(OSError/ValueError)나 스토리지 오류. 원본은 그대로 쓸 수 있으니 상태만 남긴다
+                    print(f"[upload-processing] worker{n} {key} 실패: {e}", flush=True)
+                    values = {"derivatives_status": "failed"}
+                async with AsyncSessionLocal() as db:
+                    await UploadRepo.update_by_key(db, key=key, **values)
+                    await db.commit()
+            except Exception as e:
+                print(f"[upload-processing] worker{n} {key} 기록 실패: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+
+
+processor = UploadProcessor()
+
+def start_upload_processing() -> None:
+    processor.start()
+
+async def stop_upload_processing() -> None:
+    await processor.stop()
+
+async def resume_upload_processing() -> None:
+    """서버 재시작 전에 큐에 있던(queued) 업로드를 다시 넣는다"""
+    async with AsyncSessionLocal() as db:
+        processor.enqueue(await UploadRepo.list_keys_by_derivatives_status(db, status="queued"))
+
+
+async def feed_keys(keys: List[str]) -> Dict[str, str]:
+    """파생본이 준비된 키는 feed 파생본 키로, 아니면 원래 키 그대로 (업로드가 아닌 키도 그대로)"""
+    if not keys:
+        return {}
+    try:
+        async with AsyncSessionLocal() as db:
+            found = await UploadRepo.get_derivatives(db, keys=keys)
+    except (SQLAlchemyError, OSError) as e:
+        # 파생본은 최적화일 뿐이라 조회가 안 되면 원본으로 진행
+        print(f"[upload-processing] 파생본 조회 실패: {e}", flush=True)
+        found = {}
+    return {k: (found.get(k) or {}).get("feed", {}).get("rel") or k for k in keys}
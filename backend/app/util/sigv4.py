@@ -0,0 +1,165 @@
+# backend/app/util/sigv4.py
+"""
+AWS Signature Version 4 서명 유틸리티 (S3 호환 오브젝트 스토리지용)
+
+- 헤더 서명(Authorization), presigned URL 쿼리 서명, 브라우저 POST 정책 서명을 한 곳에서 한다.
+- 파생 서명 키(HMAC 4단계: 날짜 → 리전 → 서비스 → aws4_request)는 (secret, 날짜, 리전, 서비스)별로
+  캐시하므로 하루에 한 번만 계산된다. 요청마다 드는 HMAC 은 서명 1번뿐.
+- presign_many 는 여러 경로를 같은 시각/스코프로 한 번에 서명한다. (캐러셀 게시, 목록 화면 등)
+- 모든 함수는 now 를 받을 수 있어 AWS 문서의 예제 값으로 검증할 수 있다. (scripts/check_sigv4.py)
+"""
+
+from __future__ import annotations
+
+import hmac
+import hashlib
+import urllib.parse
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=32)
+def signing_key(secret_key: str, date_stamp: str, region: str, service: str) -> bytes:
+    """파생 서명 키. 날짜가 바뀌면 새 키가 되고 예전 키는 LRU 로 밀려난다."""
+    k = _hmac(("AWS4" + secret_key).encode(), date_stamp)
+    k = _hmac(k, region)
+    k = _hmac(k, service)
+    return _hmac(k, "aws4_request")
+
+
+def quote(s: str, safe: str = "~") -> str:
+    """SigV4 URI 인코딩 (unreserved 문자 외에는 모두 %XX)"""
+    return urllib.parse.quote(s, safe=safe)
+
+
+def quote_path(path: str) -> str:
+    """캐노니컬 URI. S3 는 경로를 한 번만 인코딩하고 '/' 는 그대로 둔다."""
+    return quote(path, safe="/~")
+
+
+def canonical_query(params: Dict[str, str]) -> str:
+    return "&".join(f"{quote(k)}={quote(v)}" for k, v in sorted(params.items()))
+
+
+def amz_dates(now: Optional[datetime] = None) -> Tuple[str, str]:
+    """(x-amz-date, 날짜 스탬프)"""
+    now = now or datetime.now(timezone.utc)
+    return now.strftime("%Y%m%dT%H%M%SZ"), now.strftime("%Y%m%d")
+
+
+def _canonical_headers(headers: Dict[str, str]) -> Tuple[str, str]:
+    """(캐노니컬 헤더 블록, SignedHeaders). 이름은 소문자, 값은 앞뒤 공백 제거 + 연속 공백 하나로"""
+    norm = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    names = sorted(norm)
+    return "".join(f"{k}:{norm[k]}\n" for k in names), ";".join(names)
+
+
+class SigV4Signer:
+    def __init__(self, access_key: str, secret_key: str, region: str, service: str = "s3"):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.service = service
+
+    def scope(self, date_stamp: str) -> str:
+        return f"{date_stamp}/{self.region}/{self.service}/aws4_request"
+
+    def credential(self, date_stamp: str) -> str:
+        return f"{self.access_key}/{self.scope(date_stamp)}"
+
+    def sign_string(self, string_to_sign: str, date_stamp: str) -> str:
+        """캐시된 파생 키로 서명 (POST 정책은 base64 정책 문서를 그대로 넣는다)"""
+        key = signing_key(self.secret_key, date_stamp, self.region, self.service)
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _signature(self, canonical_request: str, amz_date: str, date_stamp: str) -> str:
+        string_to_sign = (
+            f"{ALGORITHM}\n{amz_date}\n{self.scope(date_stamp)}\n"
+            f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+        )
+        return self.sign_string(string_to_sign, date_stamp)
+
+    def sign_headers(
+        self,
+        method: str,
+        host: str,
+        path: str,
+        *,
+        query: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        payload_hash: str = EMPTY_SHA256,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, str]:
+        """
+        헤더 방식 서명. headers 는 전부 서명에 들어가므로 요청에도 같은 값으로 실어야 한다.
+        path 는 인코딩 전 경로 (/bucket/key).
+        반환: 요청에 더할 {Authorization, x-amz-date, x-amz-content-sha256}
+        """
+        amz_date, date_stamp = amz_dates(now)
+        signed = {**(headers or {}), "host": host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+        canonical_headers, signed_names = _canonical_headers(signed)
+        canonical_request = (
+            f"{method}\n{quote_path(path)}\n{canonical_query(query or {})}\n"
+            f"{canonical_headers}\n{signed_names}\n{payload_hash}"
+        )
+        signature = self._signature(canonical_request, amz_date, date_stamp)
+        return {
+            "Authorization": (
+                f"{ALGORITHM} Credential={self.credential(date_stamp)}, "
+                f"SignedHeaders={signed_names}, Signature={signature}"
+            ),
+            "x-amz-date": amz_date,
+            "x-amz-content-sha256": payload_hash,
+        }
+
+    def presign(
+        self,
+        method: str,
+        host: str,
+        path: str,
+        *,
+        expires: int,
+        headers: Optional[Dict[str, str]] = None,
+        now: Optional[datetime] = None,
+    ) -> str:
+        """presigned 쿼리 문자열 (X-Amz-Signature 포함). URL 은 {endpoint}{quote_path(path)}?{반환값}"""
+        return self.presign_many(method, host, [path], expires=expires, headers=headers, now=now)[0]
+
+    def presign_many(
+        self,
+        method: str,
+        host: str,
+        paths: List[str],
+        *,
+        expires: int,
+        headers: Optional[Dict[str, str]] = None,
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """
+        여러 경로를 한 시각/스코프로 presign. 공통 부분(쿼리, 헤더 블록, 서명 키)은 한 번만 만든다.
+        입력 순서대로 쿼리 문자열 목록 반환.
+        """
+        amz_date, date_stamp = amz_dates(now)
+        canonical_headers, signed_names = _canonical_headers({**(headers or {}), "host": host})
+        query = canonical_query({
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": self.credential(date_stamp),
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": signed_names,
+        })
+        tail = f"{query}\n{canonical_headers}\n{signed_names}\n{UNSIGNED_PAYLOAD}"
+        out = []
+        for p in paths:
+            canonical_request = f"{method}\n{quote_path(p)}\n{tail}"
+            out.append(f"{query}&X-Amz-Signature={self._signature(canonical_request, amz_date, date_stamp)}")
+        return out
@@ -0,0 +1,130 @@
+# backend/scripts/bench_compose_decode.py
+"""
+합성용 디코드 경로 벤치마크: 전체 해상도 디코드 vs draft()/reduce() 축소 디코드
+
+  cd backend
+  python scripts/bench_compose_decode.py                 # 12MP(4000x3000) 합성 JPEG 으로
+  python scripts/bench_compose_decode.py photo.jpg -n 10 # 실제 사진으로
+
+각 모드를 별도 프로세스에서 돌려 최대 RSS 를 따로 잰다.
+먼저 P/1/I;16 모드 큰 PNG 가 render_card_v2 를 통과하는지 확인한다. (reduce() 가 못 받는 모드)
+(Linux 는 /proc 의 VmHWM, 그 외는 ru_maxrss. ru_maxrss 는 fork 시 부모 값을 물려받아 부정확할 수 있음)
+"""
+import os, io, sys, json, time, argparse, resource, subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SLOT = (860, 600)
+CANVAS = (1080, 1350)
+
+
+def _make_12mp_jpeg() -> bytes:
+    """휴대폰 사진 비슷한 4000x3000 JPEG (세로로 찍은 사진처럼 Orientation=6)"""
+    from PIL import Image
+    w, h = 4000, 3000
+    img = Image.radial_gradient("L").resize((w, h)).convert("RGB")
+    noise = Image.effect_noise((w, h), 40).convert("RGB")
+    img = Image.blend(img, noise, 0.5)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90, exif=exif)
+    return out.getvalue()
+
+
+def _full_decode(data: bytes, size):
+    """기존 경로: 전체 해상도 디코드 후 LANCZOS 한 번"""
+    import math
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    iw, ih = img.size
+    scale = max(size[0] / iw, size[1] / ih)
+    rs = img.resize((math.ceil(iw * scale), math.ceil(ih * scale)), Image.Resampling.LANCZOS)
+    left, top = (rs.width - size[0]) // 2, (rs.height - size[1]) // 2
+    return rs.crop((left, top, left + size[0], top + size[1]))
+
+
+def _draft_decode(data: bytes, size):
+    from app.services.card_render import open_for, _resize_cover
+    return _resize_cover(open_for(data, *size), *size)
+
+
+def _check_png_modes() -> None:
+    """팔레트(P)/1비트/16비트 PNG 를 배경과 사진 슬롯 양쪽으로 합성해 본다"""
+    from PIL import Image
+    from app.services import card_render, card_layout
+    size = card_layout.template_size(card_layout.DEFAULT_TEMPLATE)
+    for mode in ("P", "1", "I;16"):
+        img = Image.linear_gradient("L").resize((6000, 4000))
+        img = img.convert("P") if mode == "P" else img.convert("1") if mode == "1" else img.convert("I;16")
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        data = buf.getvalue()
+        canvas = card_render.prepare_background(data, size)
+        out, meta = card_render.render_card_v2(canvas, data, "가게", "성수동")
+        print(f"PNG {mode:>4} 6000x4000 → {meta['format']} {len(out) / 1e3:.0f}KB ok")
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(mode: str, path: str, n: int) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+    fn = _full_decode if mode == "full" else _draft_decode
+    lat = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn(data, SLOT)
+        fn(data, CANVAS)
+        lat.append((time.perf_counter() - t) * 1000)
+    lat.sort()
+    print(json.dumps({"mode": mode, "max_rss_mb": round(_peak_rss_mb(), 1),
+                      "p50_ms": round(lat[len(lat) // 2], 1), "max_ms": round(lat[-1], 1)}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("image", nargs="?", help="입력 JPEG (없으면 12MP 합성 이미지)")
+    ap.add_argument("-n", type=int, default=5, help="모드별 반복 횟수 (슬롯+캔버스 한 쌍이 1회)")
+    ap.add_argument("--child", choices=["full", "draft"], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child, args.image, args.n)
+        return
+
+    _check_png_modes()
+
+    path = args.image
+    if not path:
+        path = "/tmp/pium-bench-12mp.jpg"
+        with open(path, "wb") as f:
+            f.write(_make_12mp_jpeg())
+    print(f"input: {path} ({os.path.getsize(path) / 1e6:.1f} MB), n={args.n}")
+
+    results = []
+    for mode in ("full", "draft"):
+        out = subprocess.run(
+            [sys.executable, __file__, path, "-n", str(args.n), "--child", mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    for r in results:
+        print(f"{r['mode']:>6}: max RSS {r['max_rss_mb']:>7.1f} MB   p50 {r['p50_ms']:>7.1f} ms   max {r['max_ms']:>7.1f} ms")
+    full, draft = results
+    print(f"RSS x{full['max_rss_mb'] / draft['max_rss_mb']:.1f} 감소, p50 x{full['p50_ms'] / draft['p50_ms']:.1f} 빨라짐")
+
+
+if __name__ == "__main__":
+    main()
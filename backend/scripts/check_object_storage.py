@@ -0,0 +1,179 @@
+# backend/scripts/check_object_storage.py
+"""
+object_storage.S3Client 를 LocalS3StandIn 에 붙여 기본 동작을 확인한다. (네트워크/자격증명 불필요)
+
+  cd backend
+  python scripts/check_object_storage.py
+
+PUT/GET/HEAD/DELETE, If-None-Match → 304, 5xx 재시도, 재시도 한도 초과 시 StorageError,
+put_stream 의 단일 PUT/멀티파트 전환, 크기 제한(중단된 멀티파트 정리), 파트 크기로 묶인 메모리,
+presigned URL 캐시(재사용/만료 임박 시 재서명, 썸네일 50장 비용)를 본다.
+"""
+import os, sys, time, asyncio, hashlib, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.services import object_storage
+from app.services.object_storage import S3Client, LocalS3StandIn, StorageError, ObjectTooLarge
+
+MB = 1024 * 1024
+
+
+async def _stream(total: int, chunk: int = MB):
+    """total 바이트를 chunk 씩 (내용은 위치별로 달라지게)"""
+    sent = 0
+    while sent < total:
+        n = min(chunk, total - sent)
+        yield bytes([(sent // chunk) % 251]) * n
+        sent += n
+
+
+class _DiscardTransport(httpx.AsyncBaseTransport):
+    """
+    본문을 스트림으로 읽어 버리기만 하는 멀티파트 응답기. (클라이언트 쪽 메모리만 재려고)
+    MockTransport 는 요청 본문을 request 에 붙잡아 두므로 실제 전송(httpcore)처럼 스트림만 소비한다.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            pass
+        if "uploads" in request.url.params:
+            return httpx.Response(200, text="<InitiateMultipartUploadResult><UploadId>u1</UploadId></InitiateMultipartUploadResult>")
+        if request.method == "POST":
+            return httpx.Response(200, text='<CompleteMultipartUploadResult><ETag>"x-8"</ETag></CompleteMultipartUploadResult>')
+        return httpx.Response(200, headers={"ETag": '"p"'})
+
+
+def check_presign_cache(client: S3Client) -> None:
+    """같은 키는 수명이 충분하면 같은 URL, 만료가 가까우면 새로 서명"""
+    client._presigned.clear()
+    real_time = object_storage.time.time
+    t0 = real_time()
+    a = client.presigned_url("user-1/a.jpg", expires=600)
+    assert client.presigned_url("user-1/a.jpg", expires=600) == a
+    assert client.presigned_url("user-1/a.jpg", expires=540) == a      # 같은 만료 구간(600)
+    assert client.presigned_url("user-1/a.jpg", expires=900) != a      # 다른 구간
+    assert client.presigned_url("user-1/a.jpg", expires=600, method="PUT") != a
+    # 헤더를 고정하는 업로드 URL 은 캐시하지 않는다
+    put = client.presigned_url("user-1/b.jpg", 600, "PUT", headers={"Content-Type": "image/jpeg"})
+    assert "content-type" in put and ("user-1/b.jpg", "PUT", 600) not in client._presigned._data
+
+    try:
+        object_storage.time.time = lambda: t0 + 200           # 남은 수명 ~400s ≥ 300s → 재사용
+        url, ttl = client.cached_presigned_urls(["user-1/a.jpg"], expires=600)[0]
+        assert url == a and 390 <= ttl <= 400, ttl
+        object_storage.time.time = lambda: t0 + 320           # ~280s < 300s → 재서명
+        url, ttl = client.cached_presigned_urls(["user-1/a.jpg"], expires=600)[0]
+        assert url != a and 599 <= ttl <= 600, ttl
+    finally:
+        object_storage.time.time = real_time
+    print("presigned cache: reuse / bucket / re-sign near expiry ok")
+
+    # 갤러리 한 페이지(썸네일 50장)를 반복해서 불러올 때의 서명 비용
+    keys = [f"user-1/2026/01/01/thumb-{i:02d}.jpg" for i in range(50)]
+    client._presigned.clear()
+    t = time.perf_counter()
+    client.presigned_urls(keys, expires=600)
+    first = (time.perf_counter() - t) * 1e3
+    t = time.perf_counter()
+    for _ in range(100):
+        client.presigned_urls(keys, expires=600)
+    again = (time.perf_counter() - t) * 1e3 / 100
+    c = client._presigned
+    print(f"gallery 50 urls: first {first:.2f} ms (signed), repeat {again:.3f} ms (cached), "
+          f"hits {c.hits} / misses {c.misses}")
+    assert c.misses == 50
+
+
+async def main() -> None:
+    stand_in = LocalS3StandIn(bucket="pium-dev")
+    client = S3Client(
+        endpoint="https://storage.local", bucket="pium-dev", region="kr-standard",
+        access_key="AKTEST", secret_key="secret", max_retries=2,
+        transport=httpx.MockTransport(stand_in.handle),
+    )
+    key = "user-1/2026/01/01/check.jpg"
+    body = os.urandom(256 * 1024)
+
+    etag = await client.put(key, body, "image/jpeg")
+    assert etag and stand_in.objects[key]["body"] == body
+    assert await client.get_bytes(key) == body
+    r = await client.get(key, if_none_match=etag)
+    assert r.status_code == 304
+    head = await client.head(key)
+    assert head is not None and head["Content-Type"] == "image/jpeg"
+    assert int(head["Content-Length"]) == len(body)
+    assert await client.head("user-1/none.jpg") is None
+    print("put/get/head/304 ok")
+
+    # 일시 오류는 재시도로 넘긴다
+    stand_in.fail_next(2, 503)
+    assert await client.get_bytes(key) == body
+    print("retry ok (503 x2 → 200)")
+
+    # 한도를 넘으면 마지막 상태 코드로 StorageError
+    stand_in.fail_next(3, 503)
+    try:
+        await client.get(key)
+    except StorageError as e:
+        assert e.status == 503
+    else:
+        raise AssertionError("StorageError expected")
+    print("retry exhausted → StorageError ok")
+
+    await client.delete(key)
+    assert await client.head(key) is None
+    print("delete ok")
+
+    url = client.presigned_url(key, expires=60)
+    assert url.startswith("https://storage.local/pium-dev/user-1/") and "X-Amz-Signature=" in url
+    print("presigned_url ok")
+    check_presign_cache(client)
+
+    # 한 파트 안이면 단일 PUT
+    small = await client.put_stream("user-1/small.jpg", _stream(3 * MB), "image/jpeg", max_bytes=10 * MB)
+    assert small["parts"] == 1 and len(stand_in.objects["user-1/small.jpg"]["body"]) == 3 * MB
+    print("put_stream small → single PUT ok")
+
+    # 넘으면 멀티파트. 중간에 일시 오류가 나도 파트 재시도
+    expected = hashlib.sha256()
+    async for c in _stream(12 * MB + 123):
+        expected.update(c)
+    stand_in.fail_next(1, 500)
+    big = await client.put_stream("user-1/big.jpg", _stream(12 * MB + 123), "image/jpeg", max_bytes=20 * MB)
+    obj = stand_in.objects["user-1/big.jpg"]
+    assert big["parts"] == 3 and big["size"] == 12 * MB + 123
+    assert big["sha256"] == expected.hexdigest() == hashlib.sha256(obj["body"]).hexdigest()
+    assert obj["etag"].endswith('-3"') and not stand_in.uploads
+    print("put_stream big → multipart (3 parts) ok")
+
+    # 크기 제한: 이미 시작한 멀티파트는 중단되고 객체는 안 생김
+    try:
+        await client.put_stream("user-1/huge.jpg", _stream(12 * MB), "image/jpeg", max_bytes=11 * MB)
+    except ObjectTooLarge:
+        pass
+    else:
+        raise AssertionError("ObjectTooLarge expected")
+    assert "user-1/huge.jpg" not in stand_in.objects and not stand_in.uploads
+    print("max_bytes → ObjectTooLarge + abort ok")
+
+    await client.aclose()
+
+    # 메모리: 40MB 를 올려도 최대 사용량은 파트 크기(5MB)의 몇 배 안쪽
+    sink = S3Client(endpoint="https://storage.local", bucket="pium-dev", access_key="AKTEST", secret_key="secret",
+                    transport=_DiscardTransport())
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    r = await sink.put_stream("user-1/40mb.bin", _stream(40 * MB), "application/octet-stream")
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    await sink.aclose()
+    print(f"put_stream 40MB ({r['parts']} parts): peak {peak / MB:.1f} MB")
+    assert peak < 3 * 5 * MB
+    print(f"requests sent: {len(stand_in.requests)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())